@@ -2,30 +2,39 @@ import os
 import time
 import struct
 import hashlib
+import logging
 import math
+import mmap
 import sys
+import threading
+import collections
 import concurrent.futures
+import dataclasses
 from tqdm import tqdm
 import numpy as np
-from bitarray import bitarray
 
 from marker_finder import MarkerFinder
+from content_chunking import cdc_boundaries
 from compression_methods import (
     RLECompression, 
     DictionaryCompression, 
     HuffmanCompression, 
     DeltaCompression,
-    NoCompression
+    NoCompression,
+    chunk_stats,
+    clear_chunk_stats_cache
 )
 
+logger = logging.getLogger(__name__)
+
 # Attempt to import advanced compression or fixes
 try:
     from compression_fix import get_compatible_methods
     COMPATIBLE_METHODS_AVAILABLE = True
-    print("Compatible compression methods available.")
+    logger.info("Compatible compression methods available.")
 except ImportError:
     COMPATIBLE_METHODS_AVAILABLE = False
-    print("No compatible compression methods fix. Some methods might be disabled.")
+    logger.info("No compatible compression methods fix. Some methods might be disabled.")
 
 try:
     from advanced_compression import (
@@ -43,7 +52,203 @@ try:
         from advanced_compression import LZ4Compression
 except ImportError as e:
     ADVANCED_METHODS_AVAILABLE = False
-    print(f"Error importing advanced compression methods: {e}")
+    logger.warning("Error importing advanced compression methods: %s", e)
+
+
+# Shared memory lets worker processes read the input without pickling it (Python 3.8+)
+try:
+    from multiprocessing import shared_memory
+    HAS_SHARED_MEMORY = True
+except ImportError:
+    HAS_SHARED_MEMORY = False
+
+# BLAKE3 hashes large inputs on all cores; optional checksum type 3
+try:
+    import blake3
+    HAS_BLAKE3 = True
+except ImportError:
+    HAS_BLAKE3 = False
+    logger.info("blake3 library not available. BLAKE3 checksums will be disabled.")
+
+# On free-threaded builds (PEP 703) the pure Python methods run in parallel
+# on threads, so workers can share the input instead of copying it
+FREE_THREADING = not getattr(sys, '_is_gil_enabled', lambda: True)()
+
+# Try to import numba for the JIT-compiled chunk header scan
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Compiled little-endian integer layout for the patched compressed size
+_U64 = struct.Struct('<Q')
+
+# File header fields before the marker: magic, version, header size,
+# marker length; and after the checksum: original and compressed size
+_HEADER_PREFIX = struct.Struct('<4sBIB')
+_HEADER_SIZES = struct.Struct('<QQ')
+
+# Chunk header after the marker: package_type, k_value, used_bytes,
+# original_length, compressed_length
+_CHUNK_HEADER = struct.Struct('<BBIII')
+CHUNK_HEADER_SIZE = _CHUNK_HEADER.size
+# End chunk fields after the marker: package_type=0, k_value=0 and zero
+# lengths, with used_bytes stored in 2 bytes
+_END_CHUNK_FIELDS = struct.pack('<BBHII', 0, 0, 0, 0, 0)
+
+# Why a chunk header scan stopped
+SCAN_DATA_END = 0         # all data consumed
+SCAN_HEADER_TRUNCATED = 1 # too few bytes left for a header
+SCAN_END_CHUNK = 2        # end-of-stream chunk found
+SCAN_MARKER_MISMATCH = 3  # header does not start with the marker
+SCAN_PAYLOAD_TRUNCATED = 4 # too few bytes left for the payload
+
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _scan_chunk_headers(data, pos, marker):
+        """
+        Native version of the chunk header walk over data (uint8 array).
+        Returns an (n, 4) array of (pkg_type, orig_len, payload_start,
+        payload_end) rows and the SCAN_* reason the walk stopped.
+        """
+        n = len(data)
+        marker_len = len(marker)
+        needed = marker_len + CHUNK_HEADER_SIZE
+        chunks = np.empty((64, 4), dtype=np.int64)
+        count = 0
+        status = SCAN_DATA_END
+        while pos < n:
+            if pos + needed > n:
+                status = SCAN_HEADER_TRUNCATED
+                break
+            for j in range(marker_len):
+                if data[pos + j] != marker[j]:
+                    return chunks[:count], SCAN_MARKER_MISMATCH
+            pos += marker_len
+
+            pkg_type = np.int64(data[pos])
+            orig_len = np.int64(0)
+            comp_len = np.int64(0)
+            for j in range(3, -1, -1):
+                orig_len = (orig_len << 8) | data[pos + 6 + j]
+                comp_len = (comp_len << 8) | data[pos + 10 + j]
+            pos += CHUNK_HEADER_SIZE
+
+            if pkg_type == 0:
+                status = SCAN_END_CHUNK
+                break
+            if pos + comp_len > n:
+                status = SCAN_PAYLOAD_TRUNCATED
+                break
+
+            if count == len(chunks):
+                grown = np.empty((2 * count, 4), dtype=np.int64)
+                grown[:count] = chunks
+                chunks = grown
+            chunks[count, 0] = pkg_type
+            chunks[count, 1] = orig_len
+            chunks[count, 2] = pos
+            chunks[count, 3] = pos + comp_len
+            count += 1
+            pos += comp_len
+        return chunks[:count], status
+
+    # Compile (or load from cache) up front for read-only buffers (bytes and
+    # mmap input); compiling on a real input would keep it referenced
+    _scan_chunk_headers(np.frombuffer(bytes(16), dtype=np.uint8), 0,
+                        np.frombuffer(bytes(1), dtype=np.uint8))
+
+
+def new_checksum(algorithm, data=b''):
+    """
+    Hash object for a checksum algorithm: 'blake3' (multithreaded) or any
+    hashlib algorithm name.
+    """
+    if algorithm== 'blake3':
+        if not HAS_BLAKE3:
+            raise ValueError("BLAKE3 checksum requires the blake3 library.")
+        return blake3.blake3(data, max_threads=blake3.blake3.AUTO)
+    return hashlib.new(algorithm, data)
+
+
+def data_checksum(data, algorithm='md5'):
+    """
+    Hash a bytes-like object (e.g. a file mapping) in one update call,
+    which runs without the GIL, so it can overlap other work.
+    """
+    return new_checksum(algorithm, data).digest()
+
+
+def map_file(f, size=None):
+    """
+    Memory-map an open binary file, read-only, or writable at the given
+    size (the file is resized first). Empty files cannot be mapped, so
+    b'' or a zero-length bytearray is returned for them instead.
+    """
+    if size is None:
+        if os.fstat(f.fileno()).st_size== 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    f.truncate(size)
+    if size== 0:
+        return bytearray()
+    return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_WRITE)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """
+    StreamHandler that writes to sys.stdout as it is when each record is
+    emitted, so code that redirects stdout (the Gradio log capture) sees it.
+    """
+    def emit(self, record):
+        self.stream = sys.stdout
+        super().emit(record)
+
+
+# Loggers of the compressor modules, configured by configure_logging
+COMPRESSOR_LOGGERS = (__name__, 'compression_methods', 'advanced_compression',
+                      'brotli_lzham_compression', 'compression_fix',
+                      'marker_finder', 'content_chunking')
+
+# One shared handler, so configuring logging again adds no duplicates
+_stdout_handler = _StdoutHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+
+
+def configure_logging(level=logging.INFO):
+    """
+    Print log messages from the compressor modules on stdout, for the CLI
+    and Gradio interface. Only the COMPRESSOR_LOGGERS are configured, not
+    the root logger, and calling this again just updates the level.
+    Applications embedding AdaptiveCompressor should configure logging
+    themselves, e.g. logging.basicConfig(level=logging.WARNING) for
+    production runs, which also skips formatting per-chunk debug output.
+    """
+    for name in COMPRESSOR_LOGGERS:
+        module_logger = logging.getLogger(name)
+        module_logger.setLevel(level)
+        # addHandler ignores a handler that is already attached
+        module_logger.addHandler(_stdout_handler)
+
+
+# Slotted on Python 3.10+ (dataclass slots=True); a plain dataclass before
+@dataclasses.dataclass(**({'slots': True} if sys.version_info>= (3, 10) else {}))
+class ChunkTotals:
+    """
+    Chunk counts and sizes accumulated over one compress() run.
+    """
+    total_chunks: int = 0
+    compressed_chunks: int = 0
+    raw_chunks: int = 0
+    # chunk count per method ID (the package type byte); turned into a
+    # dict of the loaded methods when stats are reported
+    method_usage: np.ndarray = dataclasses.field(default_factory=lambda: np.zeros(256, dtype=np.int64))
+    bytes_saved: int = 0
+    original_size: int = 0
+    compressed_size_without_overhead: int = 0
+    overhead_bytes: int = 0
 
 
 class AdaptiveCompressor:
@@ -55,22 +260,102 @@ class AdaptiveCompressor:
     """
 
     MAGIC_NUMBER = b'AMBC'
-    FORMAT_VERSION = 2
-
-    # Possible chunk sizes to attempt for each segment
-    CHUNK_SIZE_CANDIDATES = [1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072]
+    # Version 4 chunks are framed by their lengths alone, without a marker
+    # (marker length 0); versions up to 3 start every chunk with a marker
+    FORMAT_VERSION = 4
+
+    # Marker used when no shorter absent pattern is found
+    FALLBACK_MARKER = b'\xff\xff\x00\x00'
+
+    # Bytes hashed at each end of the input to key remembered markers,
+    # and how many markers are remembered
+    MARKER_SIGNATURE_SIZE = 4096
+    MARKER_CACHE_SIZE = 64
+
+    # Checksum type id -> (algorithm, digest size).
+    # MD5 (type 1) is kept so version 2 files can still be verified;
+    # BLAKE3 (type 3) needs the optional blake3 library.
+    CHECKSUM_TYPES = {
+        1: ('md5', 16),
+        2: ('sha256', 32),
+        3: ('blake3', 32)
+    }
+    CHECKSUM_TYPE = 2
+
+    # Possible chunk sizes to attempt for each segment: a geometric set
+    # from 4 KB to 64 KB, where most of the ratio is won per trial
+    CHUNK_SIZE_CANDIDATES = [4096, 8192, 16384, 32768, 65536]
     CHUNK_SIZE_CANDIDATES.sort(reverse=True)
 
-    def __init__(self, marker_max_length=32, sample_size=10000):
+    # Compression level per method name (Brotli: quality). Mid-range levels
+    # keep most of the ratio of the maximum levels at a fraction of the time.
+    DEFAULT_COMPRESSION_LEVELS = {
+        'deflate': 6,
+        'bzip2': 3,
+        'lzma': 1,
+        'zstd': 3,
+        'lz4': 9,
+        'brotli': 4
+    }
+
+    # Ranges handed to worker processes start on multiples of this size,
+    # are at most PARALLEL_RANGE_MAX_SIZE long, and at most
+    # PARALLEL_RANGES_PER_WORKER of them per worker are in flight
+    PARALLEL_RANGE_ALIGNMENT = CHUNK_SIZE_CANDIDATES[0]
+    PARALLEL_RANGE_MAX_SIZE = 64* PARALLEL_RANGE_ALIGNMENT
+    PARALLEL_RANGES_PER_WORKER = 2
+
+    # Chunks compressed between progress bar updates
+    PROGRESS_UPDATE_CHUNKS = 64
+
+    # Recent compression ratio per method, as an exponentially weighted
+    # moving average: initial value, weight of each new observation, and
+    # the average above which full-chunk trials of the method are skipped
+    RATIO_EWMA_INITIAL = 0.6
+    RATIO_EWMA_ALPHA = 0.2
+    RATIO_EWMA_CUTOFF = 0.95
+
+    # Most method rankings remembered per run; the cache is emptied when full
+    PROBE_CACHE_SIZE = 4096
+
+    # A probe whose entropy is within RANKING_ENTROPY_TOLERANCE bits of the
+    # last probed one reuses its ranking, for up to RANKING_REUSE_CHUNKS chunks
+    RANKING_REUSE_CHUNKS = 8
+    RANKING_ENTROPY_TOLERANCE = 0.2
+
+    # A largest candidate window with entropy (bits per byte) above
+    # RAW_ENTROPY_THRESHOLD and a fraction of small adjacent deltas below
+    # RAW_VARIATION_THRESHOLD (uniform random bytes give about 0.24) looks
+    # random. It is stored raw, without probing, if the first available
+    # fast method of RAW_CHECK_METHOD_IDS (ZStandard, LZ4, DEFLATE) cannot
+    # shrink it either; byte statistics miss repeats of random blocks.
+    RAW_ENTROPY_THRESHOLD = 7.9
+    RAW_VARIATION_THRESHOLD = 0.35
+    RAW_CHECK_METHOD_IDS = (8, 9, 5)
+
+    # Fewest chunks worth decoding in parallel
+    PARALLEL_DECODE_MIN_CHUNKS = 4
+
+    # Default worker count limit; beyond this, queue contention and memory
+    # bandwidth outweigh the extra cores
+    MAX_DEFAULT_WORKERS = 16
+
+    def __init__(self, marker_max_length=32, sample_size=10000, compression_levels=None,
+                 chunk_size_candidates=None):
         """
         Initialize the compressor with dynamic chunk logic.
         
         Args:
             marker_max_length (int): maximum length of the marker bits to find
             sample_size (int): how many bytes to sample for marker detection
+            compression_levels (dict): levels by method name, overriding
+                DEFAULT_COMPRESSION_LEVELS
+            chunk_size_candidates (list): chunk sizes to try for each chunk,
+                instead of CHUNK_SIZE_CANDIDATES
         """
         self.marker_finder = MarkerFinder(marker_max_length)
         self.sample_size = sample_size
+        self.chunk_size_candidates = sorted(chunk_size_candidates or self.CHUNK_SIZE_CANDIDATES, reverse=True)
 
         # Marker info
         self.marker_bytes = None
@@ -78,21 +363,64 @@ class AdaptiveCompressor:
         self.marker_pattern = ""
         self.marker_bytes_aligned = b''
         self.marker_byte_length = 0
+        self.chunk_overhead = 0
+
+        # Shared zeros for chunks that fail to decode, grown on demand
+        self._zero_scratch = bytes(self.chunk_size_candidates[0])
 
         # Multithread settings
         self.use_multithreading = False
-        self.max_workers = max(1, os.cpu_count() - 1)
+        self.max_workers = max(1, min((os.cpu_count() or 2) - 1, self.MAX_DEFAULT_WORKERS))
+        self._pool = None
+        self._decode_threads = None
 
         # Progress callback
         self.progress_callback = None
 
+        # Probe fingerprint -> method IDs ranked by probe ratio
+        self._probe_cache = {}
+
+        # Input signature -> (marker_bytes, marker_length) found for it
+        self._marker_cache = {}
+
+        # Recent ratio per method ID, reset at the start of each range
+        self._ratio_ewma = np.full(256, self.RATIO_EWMA_INITIAL)
+
+        # Last probed ranking, its probe entropy and how often it was reused
+        self._last_ranking = None
+        self._last_probe_entropy = 0.0
+        self._ranking_reuses = 0
+
+        # Content-defined chunking (min, avg, max) sizes, or None for the chunk size search
+        self.cdc_sizes = None
+
+        # Start every chunk with a marker found in the data
+        self.chunk_markers = False
+
         # Load compression methods
+        self.compression_levels = dict(self.DEFAULT_COMPRESSION_LEVELS)
+        if compression_levels:
+            self.compression_levels.update(compression_levels)
         self.compression_methods = []
         self._initialize_compression_methods()
 
         # Build ID -> method object
         self.method_lookup = {m.type_id: m for m in self.compression_methods}
 
+        # Same mapping as a 256-entry table indexed by the package type byte
+        self._method_table = [None]* 256
+        for m in self.compression_methods:
+            self._method_table[m.type_id] = m
+
+        # Method that confirms random-looking windows are incompressible
+        self._raw_check_method = next((self._method_table[i] for i in self.RAW_CHECK_METHOD_IDS
+                                       if self._method_table[i] is not None), None)
+
+        # Distinct method IDs (excluding raw) that are probed when ranking methods
+        self._probe_method_ids = np.array(
+            list(dict.fromkeys(m.type_id for m in self.compression_methods if m.type_id != 255)),
+            dtype=np.int16)
+
         # Named references for logging or stats
         self.method_names = {
             1: "RLE", 
@@ -126,7 +454,13 @@ class AdaptiveCompressor:
             255:(1,     999999999) # No Compression => entire range
         }
 
+        # Same ranges as a 256-entry table, so the selection loop does not
+        # repeat the dict lookup and default for every candidate
+        self._chunk_pref_table = [self.method_chunk_prefs.get(i, (1, 999999999)) for i in range(256)]
+
     def _initialize_compression_methods(self):
+        levels = self.compression_levels
+
         # Basic compression
         self.compression_methods.append(RLECompression())
         self.compression_methods.append(DictionaryCompression())
@@ -135,22 +469,22 @@ class AdaptiveCompressor:
 
         # Possibly from fix
         if COMPATIBLE_METHODS_AVAILABLE:
-            for method in get_compatible_methods():
+            for method in get_compatible_methods(self.compression_levels):
                 self.compression_methods.append(method)
 
         # If advanced are available
         if 'DeflateCompression' in globals():
-            self.compression_methods.append(DeflateCompression())
+            self.compression_methods.append(DeflateCompression(level=levels['deflate']))
         if 'Bzip2Compression' in globals():
-            self.compression_methods.append(Bzip2Compression())
+            self.compression_methods.append(Bzip2Compression(level=levels['bzip2']))
         if 'LZMACompression' in globals():
-            self.compression_methods.append(LZMACompression())
+            self.compression_methods.append(LZMACompression(level=levels['lzma']))
         if 'HAS_ZSTD' in globals() and HAS_ZSTD:
             from advanced_compression import ZstdCompression
-            self.compression_methods.append(ZstdCompression())
+            self.compression_methods.append(ZstdCompression(level=levels['zstd']))
         if 'HAS_LZ4' in globals() and HAS_LZ4:
             from advanced_compression import LZ4Compression
-            self.compression_methods.append(LZ4Compression())
+            self.compression_methods.append(LZ4Compression(level=levels['lz4']))
 
         # Possibly add Brotli, LZHAM
         # ...
@@ -160,15 +494,15 @@ class AdaptiveCompressor:
             if os.path.exists('brotli_lzham_compression.py'):
                 from brotli_lzham_compression import BrotliCompression, HAS_BROTLI
                 if HAS_BROTLI:
-                    self.compression_methods.append(BrotliCompression())
-                    print("Added Brotli compression to methods list")
+                    self.compression_methods.append(BrotliCompression(quality=levels['brotli']))
+                    logger.info("Added Brotli compression to methods list")
                     
                 # Try to import LZHAM
                 try:
                     from brotli_lzham_compression import LZHAMCompression, HAS_LZHAM
                     if HAS_LZHAM:
                         self.compression_methods.append(LZHAMCompression())
-                        print("Added LZHAM compression to methods list")
+                        logger.info("Added LZHAM compression to methods list")
                 except ImportError:
                     pass
         except ImportError:
@@ -187,11 +521,80 @@ class AdaptiveCompressor:
         self.use_multithreading = True
         if max_workers:
             self.max_workers = max_workers
-        print(f"Multithreading enabled with {self.max_workers} workers")
+
+        # One worker pool per compressor, kept across compress() calls.
+        # Threads only help the pure Python methods without the GIL.
+        self._shutdown_pool()
+        if FREE_THREADING:
+            executor_cls = concurrent.futures.ThreadPoolExecutor
+        else:
+            executor_cls = concurrent.futures.ProcessPoolExecutor
+        self._pool = executor_cls(
+            max_workers=self.max_workers,
+            initializer=_worker_init,
+            initargs=(type(self), self.compression_levels, self.chunk_size_candidates)
+        )
+        # Chunks of methods that release the GIL decode on threads, from
+        # zero-copy payload views; in free-threaded builds that is the pool
+        if FREE_THREADING:
+            self._decode_threads = self._pool
+        else:
+            self._decode_threads = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        logger.info("Multithreading enabled with %d %s", self.max_workers,
+                    "threads" if FREE_THREADING else "worker processes")
 
     def disable_multithreading(self):
         self.use_multithreading = False
-        print("Multithreading disabled")
+        self._shutdown_pool()
+        logger.info("Multithreading disabled")
+
+    def close(self):
+        """
+        Shut down the worker pools, if any. The compressor stays usable
+        (single-threaded until multithreading is enabled again).
+        """
+        self.use_multithreading = False
+        self._shutdown_pool()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def enable_content_defined_chunking(self, min_size=2048, avg_size=8192, max_size=65536):
+        """
+        Cut chunks at content-defined positions (Gear rolling hash) instead
+        of searching the chunk size candidates; only the method is picked per chunk.
+        """
+        self.cdc_sizes = (min_size, avg_size, max_size)
+        logger.info("Content-defined chunking enabled (%d/%d/%d bytes)", min_size, avg_size, max_size)
+
+    def disable_content_defined_chunking(self):
+        self.cdc_sizes = None
+        logger.info("Content-defined chunking disabled")
+
+    def enable_chunk_markers(self):
+        """
+        Start every chunk with a bit pattern absent from the data, which
+        lets the decoder check each chunk header, at the cost of a marker
+        search per file and 1-4 bytes per chunk. Files written before
+        version 4 always have markers.
+        """
+        self.chunk_markers = True
+        logger.info("Chunk markers enabled")
+
+    def disable_chunk_markers(self):
+        self.chunk_markers = False
+        logger.info("Chunk markers disabled")
+
+    def _shutdown_pool(self):
+        if self._decode_threads is not None and self._decode_threads is not self._pool:
+            self._decode_threads.shutdown()
+        self._decode_threads = None
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
     def _init_marker(self, marker_bytes, marker_length):
         """
@@ -200,23 +603,21 @@ class AdaptiveCompressor:
         self.marker_bytes = marker_bytes
         self.marker_length = marker_length
 
-        bits = bitarray()
-        bits.frombytes(marker_bytes)
-        bits = bits[:marker_length]
-        self.marker_pattern = bits.to01()
+        # The marker is the first marker_length bits (MSB first) of marker_bytes
+        nbytes = (marker_length+7)//8
+        marker_int = int.from_bytes(marker_bytes, 'big') >> max(0, 8*len(marker_bytes) - marker_length)
+        self.marker_pattern = bin(marker_int)[2:].zfill(marker_length) if marker_length else ''
 
-        if marker_length<=8:
-            shift = 8 - marker_length
-            marker_int = int(self.marker_pattern, 2)
-            marker_int <<= shift
-            self.marker_bytes_aligned = bytes([marker_int])
-        else:
-            padded_bits = bitarray(self.marker_pattern)
-            while len(padded_bits)%8!=0:
-                padded_bits.append(0)
-            self.marker_bytes_aligned = padded_bits.tobytes()
+        # Left-align the marker bits, zero-padding to a byte boundary
+        self.marker_bytes_aligned = (marker_int << (8*nbytes - marker_length)).to_bytes(nbytes, 'big')
+
+        self.marker_byte_length = nbytes
+
+        # Every chunk header has the same size for a given marker
+        self.chunk_overhead = self._calculate_fixed_overhead()
 
-        self.marker_byte_length = (marker_length+7)//8
+        # The end chunk depends only on the marker
+        self._end_chunk = self.marker_bytes_aligned + _END_CHUNK_FIELDS
 
     def compress(self, input_file, output_file):
         """
@@ -224,35 +625,52 @@ class AdaptiveCompressor:
         """
         start_t = time.time()
         with open(input_file,"rb") as f:
-            file_data = f.read()
+            file_data = map_file(f)
 
-        # Find marker
-        marker_bytes, marker_len = self._find_marker(file_data, self.sample_size)
-        self._init_marker(marker_bytes, marker_len)
-
-        # Build header
-        chksum = hashlib.md5(file_data).digest()
-        header = self._build_header(marker_bytes, marker_len, chksum, len(file_data))
+        try:
+            algorithm = self.CHECKSUM_TYPES[self.CHECKSUM_TYPE][0]
+            # Find marker, unless chunks are framed by their lengths alone
+            if self.chunk_markers or self.FORMAT_VERSION< 4:
+                # Hash the mapping on a thread while the marker is searched
+                with concurrent.futures.ThreadPoolExecutor(max_workers=1) as hasher:
+                    chksum_future = hasher.submit(data_checksum, file_data, algorithm)
+                    marker_bytes, marker_len = self._find_marker(file_data, self.sample_size)
+                    chksum = chksum_future.result()
+            else:
+                marker_bytes, marker_len = b'', 0
+                chksum = data_checksum(file_data, algorithm)
+            self._init_marker(marker_bytes, marker_len)
 
-        # Now compress
-        compressed_data = self._adaptive_compress(file_data)
-        final_size = len(header)+ len(compressed_data)
+            # Build header
+            header = self._build_header(marker_bytes, marker_len, chksum, len(file_data))
 
-        if final_size> len(file_data):
-            # Store raw
-            print("Compression bigger than original => store raw.")
-            with open(output_file,"wb") as f:
-                f.write(file_data)
-            stats= self._build_stats_raw(len(file_data), time.time()-start_t)
-            return stats
-        else:
-            # Write
-            header= self._update_header_compressed_size(header, len(compressed_data))
+            # Now compress, writing each package as it is produced; the
+            # header's compressed size is patched in once it is known
             with open(output_file,"wb") as f:
                 f.write(header)
-                f.write(compressed_data)
-            stats= self._calculate_compression_stats(len(file_data), final_size, time.time()-start_t)
+                write = f.write
+                compressed_size = 0
+                # worker processes can map the input themselves
+                path= input_file if isinstance(file_data, mmap.mmap) else None
+                for package in self._adaptive_compress(file_data, path):
+                    write(package)
+                    compressed_size += len(package)
+                final_size = len(header)+ compressed_size
+
+                f.seek(0)
+                if final_size> len(file_data):
+                    # Store raw
+                    logger.info("Compression bigger than original => store raw.")
+                    f.truncate()
+                    f.write(file_data)
+                    stats= self._build_stats_raw(len(file_data), time.time()-start_t)
+                else:
+                    f.write(self._update_header_compressed_size(header, compressed_size))
+                    stats= self._calculate_compression_stats(len(file_data), final_size, time.time()-start_t)
             return stats
+        finally:
+            if isinstance(file_data, mmap.mmap):
+                file_data.close()
 
     def _build_stats_raw(self, original_size, elapsed):
         ratio=1.0
@@ -286,66 +704,134 @@ class AdaptiveCompressor:
     def decompress(self, input_file, output_file):
         start_t= time.time()
         with open(input_file,"rb") as f:
-            cdata= f.read()
-        hdr= self._parse_header(cdata)
-        self._init_marker(hdr['marker_bytes'], hdr['marker_length'])
-        body= cdata[hdr['header_size']:]
-        decompressed= self._adaptive_decompress(body, hdr['original_size'])
-        with open(output_file,"wb") as f:
-            f.write(decompressed)
-        # verify
-        actual= hashlib.md5(decompressed).digest()
-        if actual!= hdr['checksum']:
-            raise ValueError("Checksum mismatch => possibly corrupted file.")
-        stats= self._calculate_decompression_stats(len(cdata), len(decompressed), time.time()- start_t)
-        return stats
+            cdata= map_file(f)
+        try:
+            hdr= self._parse_header(cdata)
+            self._init_marker(hdr['marker_bytes'], hdr['marker_length'])
+            # hash each block as it is copied into the pre-sized output mapping
+            algorithm= self.CHECKSUM_TYPES[hdr['checksum_type']][0]
+            h= new_checksum(algorithm)
+            decompressed_size=0
+            with open(output_file,"wb+") as f:
+                out= map_file(f, hdr['original_size'])
+                update_hash= h.update
+                try:
+                    for block in self._adaptive_decompress(cdata, hdr['original_size'], hdr['header_size']):
+                        update_hash(block)
+                        end= decompressed_size+ len(block)
+                        out[decompressed_size: end]= block
+                        decompressed_size= end
+                    if decompressed_size< hdr['original_size']:
+                        # the rest of the pre-sized output is already zero
+                        with memoryview(out) as view:
+                            update_hash(view[decompressed_size:])
+                        decompressed_size= hdr['original_size']
+                finally:
+                    if isinstance(out, mmap.mmap):
+                        out.close()
+            # verify
+            if h.digest()!= hdr['checksum']:
+                raise ValueError("Checksum mismatch => possibly corrupted file.")
+            stats= self._calculate_decompression_stats(len(cdata), decompressed_size, time.time()- start_t)
+            return stats
+        finally:
+            if isinstance(cdata, mmap.mmap):
+                cdata.close()
+
+    def decompress_to_stream(self, input_file, out_stream):
+        """
+        Decompress input_file, writing each decoded block to the binary
+        stream out_stream as it is produced (e.g. a pipe or socket), so
+        the output is never held in memory or mapped as a whole.
+        """
+        start_t= time.time()
+        with open(input_file,"rb") as f:
+            cdata= map_file(f)
+        try:
+            hdr= self._parse_header(cdata)
+            self._init_marker(hdr['marker_bytes'], hdr['marker_length'])
+            algorithm= self.CHECKSUM_TYPES[hdr['checksum_type']][0]
+            h= new_checksum(algorithm)
+            update_hash= h.update
+            write= out_stream.write
+            decompressed_size=0
+            for block in self._adaptive_decompress(cdata, hdr['original_size'], hdr['header_size']):
+                update_hash(block)
+                write(block)
+                decompressed_size+= len(block)
+            # zero-fill a short stream in bounded blocks
+            while decompressed_size< hdr['original_size']:
+                zeros= self._zeros(min(hdr['original_size']- decompressed_size, len(self._zero_scratch)))
+                update_hash(zeros)
+                write(zeros)
+                decompressed_size+= len(zeros)
+            # verify
+            if h.digest()!= hdr['checksum']:
+                raise ValueError("Checksum mismatch => possibly corrupted file.")
+            stats= self._calculate_decompression_stats(len(cdata), decompressed_size, time.time()- start_t)
+            return stats
+        finally:
+            if isinstance(cdata, mmap.mmap):
+                cdata.close()
 
     def _find_marker(self, file_data, sample_size):
         """
-        Fallback logic if no marker_finder is available, or we can do your original approach
-        that picks a short marker not in the data. We'll skip for brevity and return a 32-bit fallback.
+        Pick the shortest bit pattern absent from (a sample of) the data
+        with the marker_finder, so chunk headers carry as few marker bytes
+        as possible. Falls back to a fixed 32-bit marker if every pattern
+        up to marker_max_length bits occurs.
+        Markers are remembered by input size and a hash of both ends, so
+        repeat runs on the same file skip the search. A stale hit is still
+        a valid marker: chunks are length-framed, and the marker only
+        validates chunk headers.
         """
-        from bitarray import bitarray
-        marker_bits = bitarray('11111111111111110000000000000000')
-        return marker_bits.tobytes(), 32
+        n= self.MARKER_SIGNATURE_SIZE
+        key= (len(file_data), sample_size,
+              hashlib.blake2b(file_data[:n]+ file_data[-n:], digest_size=16).digest())
+        marker= self._marker_cache.get(key)
+        if marker is not None:
+            return marker
+
+        try:
+            marker= self.marker_finder.find_marker(file_data, sample_size)
+        except ValueError as e:
+            logger.warning("%s; using the fixed 32-bit marker", e)
+            marker= (self.FALLBACK_MARKER, 32)
+
+        if len(self._marker_cache)>= self.MARKER_CACHE_SIZE:
+            self._marker_cache.clear()
+        self._marker_cache[key]= marker
+        return marker
 
     def _build_header(self, marker_bytes, marker_len, chksum, original_size):
-        hdr= bytearray()
-        hdr.extend(self.MAGIC_NUMBER)
-        hdr.append(self.FORMAT_VERSION)
-        hdr.extend(b'\x00\x00\x00\x00')
-        hdr.append(marker_len)
-        hdr.extend(marker_bytes)
-        hdr.append(1) # md5
-        hdr.extend(chksum)
-        hdr.extend(struct.pack('<Q', original_size))
-        hdr.extend(b'\x00\x00\x00\x00\x00\x00\x00\x00')
-        hsize= len(hdr)
-        hdr[5:9]= struct.pack('<I', hsize)
-        return bytes(hdr)
+        # magic, version, header size, marker length, marker, checksum type,
+        # checksum, original size, compressed size (patched in later)
+        fmt= f'<4sBIB{len(marker_bytes)}sB{len(chksum)}sQQ'
+        hsize= struct.calcsize(fmt)
+        return bytearray(struct.pack(fmt, self.MAGIC_NUMBER, self.FORMAT_VERSION, hsize,
+                                     marker_len, marker_bytes, self.CHECKSUM_TYPE, chksum,
+                                     original_size, 0))
 
     def _update_header_compressed_size(self, hdr, csize):
-        hdr= bytearray(hdr)
-        hdr[-8:]= struct.pack('<Q', csize)
-        return bytes(hdr)
+        _U64.pack_into(hdr, len(hdr)- 8, csize)
+        return hdr
 
     def _parse_header(self, data: bytes):
         if data[:4]!= self.MAGIC_NUMBER:
             raise ValueError("Magic mismatch")
-        version= data[4]
+        _, version, hdr_size, marker_len= _HEADER_PREFIX.unpack_from(data)
         if version> self.FORMAT_VERSION:
             raise ValueError(f"Unsupported version: {version}")
-        hdr_size= struct.unpack('<I', data[5:9])[0]
-        marker_len= data[9]
+        pos= _HEADER_PREFIX.size
         msize= (marker_len+7)//8
-        marker_bytes= data[10:10+msize]
-        ctype= data[10+ msize]
-        csum_size= 16 if ctype==1 else 0
-        csum= data[11+msize: 11+msize+ csum_size]
-        orig_pos= 11+ msize+ csum_size
-        orig_size= struct.unpack('<Q', data[orig_pos: orig_pos+8])[0]
-        comp_pos= orig_pos+8
-        comp_size= struct.unpack('<Q', data[comp_pos: comp_pos+8])[0]
+        marker_bytes= data[pos: pos+ msize]
+        ctype= data[pos+ msize]
+        if ctype not in self.CHECKSUM_TYPES:
+            raise ValueError(f"Unsupported checksum type: {ctype}")
+        csum_size= self.CHECKSUM_TYPES[ctype][1]
+        pos+= msize+ 1
+        csum= data[pos: pos+ csum_size]
+        orig_size, comp_size= _HEADER_SIZES.unpack_from(data, pos+ csum_size)
         return {
             'format_version': version,
             'header_size': hdr_size,
@@ -360,7 +846,7 @@ class AdaptiveCompressor:
     # ----------------------------------------------------------------
     #   MAIN DYNAMIC CHUNK LOGIC
     # ----------------------------------------------------------------
-    def _adaptive_compress(self, file_data: bytes) -> bytes:
+    def _adaptive_compress(self, file_data: bytes, path=None):
         """
         Single pass:
           - position=0
@@ -368,116 +854,356 @@ class AdaptiveCompressor:
           - process chunk, produce the chunk package
           - repeat
           - add end chunk
+        With multithreading enabled, independent ranges of the file go
+        through the same loop in the worker pool; path, if file_data maps
+        that file, lets worker processes map it too.
+        Yields the chunk packages in order, as they are produced, so the
+        compressed stream is never held in memory as a whole: at most one
+        package, or in parallel mode the packages of the ranges in flight.
+        Stats are added once the last chunk is done.
         """
         self._init_stats(file_data)
-        output= bytearray()
-        position=0
-        chunk_index=0
 
-        with tqdm(total=len(file_data), desc="Compressing", unit="B", unit_scale=True) as pbar:
-            while position< len(file_data):
-                csize, method_id= self._pick_best_chunk_and_method(file_data, position)
-                chunk_data= file_data[position: position+ csize]
-                # Now produce the final chunk and chunk stats
-                package_data, chunk_stats= self._process_chunk(chunk_data, method_id, chunk_index)
-                self._update_stats(chunk_stats)
-                output.extend(package_data)
+        if self.use_multithreading and len(file_data)> self.PARALLEL_RANGE_ALIGNMENT:
+            results= self._compress_chunks_parallel(file_data, path)
+        else:
+            results= self._compress_chunks_sequential(file_data)
 
-                position+= csize
-                chunk_index+=1
-                pbar.update(csize)
+        all_chunk_stats= []
+        add_stats= all_chunk_stats.append
+        for package_data, chunk_stats in results:
+            add_stats(chunk_stats)
+            yield package_data
+        self._update_stats(all_chunk_stats)
 
         # end chunk
         end_chunk= self._create_end_chunk()
-        output.extend(end_chunk)
-        self.chunk_stats['overhead_bytes']+= len(end_chunk)
-        return bytes(output)
-
-    def _adaptive_decompress(self, data: bytes, orig_size: int) -> bytes:
-        output= bytearray()
-        pos=0
-        while pos< len(data):
-            needed= len(self.marker_bytes_aligned)+1+1+4+4+4
-            if pos+ needed> len(data):
-                print("No more chunk headers can be read, stopping.")
+        self.chunk_stats.overhead_bytes+= len(end_chunk)
+        yield end_chunk
+
+    def _compress_chunks_sequential(self, file_data: bytes):
+        """
+        Run the chunk loop over the whole file in this process, on a view
+        of it, so chunks and candidate windows are zero-copy slices.
+        Yields (package_bytes, chunk_stats).
+        """
+        position=0
+        with memoryview(file_data) as view, \
+                tqdm(total=len(file_data), desc="Compressing", unit="B", unit_scale=True, mininterval=0.2) as pbar:
+            for count, (package_data, chunk_stats) in enumerate(self._compress_range(view), 1):
+                yield package_data, chunk_stats
+                position+= chunk_stats['original_size']
+                # batch progress updates instead of one per chunk
+                if count % self.PROGRESS_UPDATE_CHUNKS== 0:
+                    pbar.update(position- pbar.n)
+            pbar.update(position- pbar.n)
+
+    def _compress_range(self, data: bytes, chunk_index=0):
+        """
+        Generator over the chunk loop for one contiguous range of data:
+        pick the best chunk size+method, then build the chunk package.
+        Yields (package_bytes, chunk_stats).
+        data may be a memoryview of a mapping; no reference to it is kept
+        once the generator is done.
+        """
+        self._ratio_ewma.fill(self.RATIO_EWMA_INITIAL)
+        self._last_ranking= None
+        try:
+            if self.cdc_sizes is not None:
+                yield from self._compress_cdc_range(data, chunk_index)
+                return
+
+            position=0
+            while position< len(data):
+                csize, method_id, cdata= self._pick_best_chunk_and_method(data, position)
+                chunk_data= data[position: position+ csize]
+                # Now produce the final chunk and chunk stats, reusing the winning trial output
+                yield self._process_chunk(chunk_data, method_id, chunk_index, cdata)
+                position+= csize
+                chunk_index+=1
+        finally:
+            clear_chunk_stats_cache()
+
+    def _compress_cdc_range(self, data: bytes, chunk_index=0, probe_size: int=2048, top_k: int=2):
+        """
+        Like _compress_range, but chunks end at content-defined boundaries
+        and only the method is picked for each chunk.
+        """
+        position=0
+        for end in cdc_boundaries(data, *self.cdc_sizes):
+            chunk_data= data[position: end]
+            if self._looks_random(chunk_data):
+                method_id, cdata= 255, None
+            else:
+                ranking= self._rank_methods(chunk_data[:probe_size])
+                _, method_id, cdata= self._pick_best_method(chunk_data, ranking, top_k)
+            yield self._process_chunk(chunk_data, method_id, chunk_index, cdata)
+            position= end
+            chunk_index+=1
+
+    def _partition_ranges(self, size: int):
+        """
+        Split [0, size) into ranges whose boundaries are aligned to
+        PARALLEL_RANGE_ALIGNMENT (the largest default chunk size), so each
+        range can be chunked independently. Small inputs get one range per
+        worker; large ones ranges of PARALLEL_RANGE_MAX_SIZE.
+        """
+        align= self.PARALLEL_RANGE_ALIGNMENT
+        blocks= (size+ align- 1)// align
+        per_range= min(((blocks+ self.max_workers- 1)// self.max_workers)* align,
+                       self.PARALLEL_RANGE_MAX_SIZE)
+        return [(start, min(start+ per_range, size)) for start in range(0, size, per_range)]
+
+    def _compress_chunks_parallel(self, file_data: bytes, path=None):
+        """
+        Run the chunk loop over independent ranges of the file in the
+        compressor's worker pool, so CPU-bound (pure Python) methods are not
+        serialized by the GIL. Worker processes map the input file at path
+        themselves, or, for input that is not a file mapping, read it from
+        one shared memory copy; either way they only receive (start, end)
+        offsets and read their range zero-copy. Worker threads get views of
+        the input.
+        Yields (package_bytes, chunk_stats) in file order, one range at a time.
+        Only PARALLEL_RANGES_PER_WORKER ranges per worker are submitted
+        ahead, and each range's packages are released once yielded, so
+        memory is bounded by the ranges in flight, not the whole output.
+        """
+        ranges= self._partition_ranges(len(file_data))
+        logger.info("Compressing %d ranges with %d workers", len(ranges), self.max_workers)
+
+        shm= None
+        view= None
+        if not isinstance(self._pool, concurrent.futures.ProcessPoolExecutor):
+            # worker threads slice one view of the input
+            path= None
+            view= memoryview(file_data)
+        elif path is None and HAS_SHARED_MEMORY:
+            shm= shared_memory.SharedMemory(create=True, size=len(file_data))
+            shm.buf[:len(file_data)]= file_data
+
+        window= self.PARALLEL_RANGES_PER_WORKER* self.max_workers
+        pending= collections.deque()
+        try:
+            with tqdm(total=len(file_data), desc="Compressing", unit="B", unit_scale=True) as pbar:
+                for start, end in ranges:
+                    if path is not None:
+                        args= (None, path, None, start, end)
+                    elif shm is not None:
+                        args= (shm.name, None, None, start, end)
+                    elif view is not None:
+                        args= (None, None, view[start:end], start, end)
+                    else:
+                        # pickled to the worker process
+                        args= (None, None, file_data[start:end], start, end)
+                    pending.append((end- start, self._pool.submit(
+                        _worker_compress_range, self.marker_bytes, self.marker_length, self.cdc_sizes, *args)))
+                    if len(pending)>= window:
+                        # the popped future (and its packages) is dropped
+                        # when the next range rebinds these names
+                        size, future= pending.popleft()
+                        yield from future.result()
+                        pbar.update(size)
+                while pending:
+                    size, future= pending.popleft()
+                    yield from future.result()
+                    pbar.update(size)
+        finally:
+            # a closed generator must not unlink memory that workers still read
+            for _, future in pending:
+                future.cancel()
+            concurrent.futures.wait([future for _, future in pending])
+            if view is not None:
+                view.release()
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def _adaptive_decompress(self, data: bytes, orig_size: int, pos: int=0):
+        """
+        Decode the chunk stream starting at offset pos of data, yielding
+        each chunk's output in order.
+        The output is truncated to at most orig_size bytes; a short stream
+        is not padded here, since decompress() writes into a pre-sized,
+        zero-filled output.
+        With multithreading enabled, chunks are decoded in parallel.
+        """
+        chunks= self._scan_chunks(data, pos)
+        logger.debug("Decoding %d chunks", len(chunks))
+
+        if (self.use_multithreading and self._pool is not None
+                and len(chunks)>= self.PARALLEL_DECODE_MIN_CHUNKS):
+            blocks= self._decode_chunks_parallel(data, chunks)
+        else:
+            blocks= self._decode_chunks_inplace(data, chunks)
+
+        produced=0
+        for chunk_out in blocks:
+            if produced+ len(chunk_out)> orig_size:
+                # a view, so the overlong block is not copied to trim it
+                chunk_out= memoryview(chunk_out)[: orig_size- produced]
+            produced+= len(chunk_out)
+            yield chunk_out
+
+            if produced>= orig_size:
                 break
 
-            chunk_marker= data[pos: pos+ len(self.marker_bytes_aligned)]
-            if chunk_marker!= self.marker_bytes_aligned:
+    def _decode_chunks_inplace(self, data: bytes, chunks):
+        """
+        Decode each chunk from a zero-copy memoryview of its payload.
+        Every view is released as soon as its chunk is decoded, so the
+        input (possibly an mmap) can be closed afterwards.
+        """
+        with memoryview(data) as view:
+            for pkg_type, orig_len, start, end in chunks:
+                with view[start: end] as payload:
+                    block= self._decode_chunk(pkg_type, payload, orig_len)
+                yield block
+
+    def _decode_chunks_parallel(self, data: bytes, chunks):
+        """
+        Decode chunks concurrently, yielding their outputs in order.
+        Chunks whose method releases the GIL are decoded on threads from
+        payload views; the rest go to the worker pool as payload copies.
+        At most a few chunks per worker are in flight, and all of them
+        have finished before the input view is released.
+        """
+        window= 4* self.max_workers
+        threads_only= self._decode_threads is self._pool
+        method_table= self._method_table
+        pending= collections.deque()
+        with memoryview(data) as view:
+            try:
+                for pkg_type, orig_len, start, end in chunks:
+                    method= method_table[pkg_type]
+                    if threads_only or method is None or method.releases_gil:
+                        future= self._decode_threads.submit(self._decode_view, view, pkg_type, orig_len, start, end)
+                    else:
+                        # worker processes need a picklable payload copy
+                        future= self._pool.submit(_worker_decode_chunk, pkg_type, data[start: end], orig_len)
+                    pending.append(future)
+                    if len(pending)>= window:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                # a consumer that stops early must not leave views in use
+                for future in pending:
+                    future.cancel()
+                concurrent.futures.wait(pending)
+
+    def _decode_view(self, view, pkg_type: int, orig_len: int, start: int, end: int):
+        with view[start: end] as payload:
+            return self._decode_chunk(pkg_type, payload, orig_len)
+
+    def _scan_chunks(self, data: bytes, pos: int=0):
+        """
+        Walk the chunk headers once, from offset pos up to the end chunk.
+        Returns a list of (pkg_type, orig_len, payload_start, payload_end).
+        Uses the JIT-compiled scan when numba is available.
+        """
+        if HAS_NUMBA and pos< len(data):
+            headers, status= _scan_chunk_headers(
+                np.frombuffer(data, dtype=np.uint8), pos,
+                np.frombuffer(self.marker_bytes_aligned, dtype=np.uint8))
+            if status== SCAN_MARKER_MISMATCH:
                 raise ValueError("Marker mismatch in chunk header.")
-            pos+= len(self.marker_bytes_aligned)
-            
-            pkg_type= data[pos]
-            pos+=1
-            k_value= data[pos]
-            pos+=1
-
-            used_bytes= struct.unpack("<I", data[pos:pos+4])[0]
-            pos+=4
-            orig_len= struct.unpack("<I", data[pos:pos+4])[0]
-            pos+=4
-            comp_len= struct.unpack("<I", data[pos:pos+4])[0]
-            pos+=4
+            if status== SCAN_HEADER_TRUNCATED:
+                logger.debug("No more chunk headers can be read, stopping.")
+            elif status== SCAN_END_CHUNK:
+                logger.debug("End-of-stream chunk found.")
+            elif status== SCAN_PAYLOAD_TRUNCATED:
+                logger.warning("Not enough bytes remain for chunk payload.")
+            return [tuple(row) for row in headers.tolist()]
+
+        chunks= []
+        # bind loop constants and bound methods once, outside the header loop
+        add_chunk= chunks.append
+        find= data.find
+        unpack_header= _CHUNK_HEADER.unpack_from
+        marker= self.marker_bytes_aligned
+        marker_len= len(marker)
+        needed= self.chunk_overhead
+        data_len= len(data)
+        while pos< data_len:
+            if pos+ needed> data_len:
+                logger.debug("No more chunk headers can be read, stopping.")
+                break
+
+            # bounded find compares in place (bytes and mmap), without slicing
+            if find(marker, pos, pos+ marker_len)!= pos:
+                raise ValueError("Marker mismatch in chunk header.")
+            pos+= marker_len
+
+            # all header fields in one call, read in place
+            pkg_type, k_value, used_bytes, orig_len, comp_len= unpack_header(data, pos)
+            pos+= CHUNK_HEADER_SIZE
 
             if pkg_type==0:
-                print("End-of-stream chunk found.")
+                logger.debug("End-of-stream chunk found.")
                 break
-            if pos+ comp_len> len(data):
-                print("Not enough bytes remain for chunk payload.")
+            if pos+ comp_len> data_len:
+                logger.warning("Not enough bytes remain for chunk payload.")
                 break
 
-            payload= data[pos: pos+ comp_len]
+            add_chunk((pkg_type, orig_len, pos, pos+ comp_len))
             pos+= comp_len
 
-            method= self.method_lookup.get(pkg_type)
-            if method is None:
-                # treat as raw
-                output.extend(payload)
-            else:
-                try:
-                    chunk_out= method.decompress(payload, orig_len)
-                    output.extend(chunk_out)
-                except:
-                    # fallback
-                    output.extend(bytes(orig_len))
-
-            if len(output)>= orig_size:
-                break
+        return chunks
 
-        if len(output)< orig_size:
-            short= orig_size- len(output)
-            output.extend(bytes(short))
-        elif len(output)> orig_size:
-            over= len(output)- orig_size
-            output= output[: orig_size]
+    def _decode_chunk(self, pkg_type: int, payload: bytes, orig_len: int) -> bytes:
+        if pkg_type== 255 and len(payload)== orig_len:
+            # stored chunk: a plain copy, without method dispatch
+            return bytes(payload)
+        method= self._method_table[pkg_type]
+        if method is None:
+            # treat as raw (a copy, since payload may be a view)
+            return bytes(payload)
+        try:
+            return method.decompress(payload, orig_len)
+        except Exception as e:
+            logger.warning("Error decompressing chunk with method %d: %s", pkg_type, e)
+            # fallback
+            return self._zeros(orig_len)
 
-        return bytes(output)
+    def _zeros(self, n: int):
+        """
+        Read-only view of n zero bytes, sliced from a shared scratch buffer
+        rather than allocated per failed chunk.
+        """
+        if n> len(self._zero_scratch):
+            self._zero_scratch= bytes(n)
+        return memoryview(self._zero_scratch)[:n]
 
     # Stats initialization
     def _init_stats(self, file_data: bytes):
-        self.chunk_stats= {
-            'total_chunks': 0,
-            'compressed_chunks': 0,
-            'raw_chunks': 0,
-            'method_usage': {},
-            'bytes_saved': 0,
-            'original_size': len(file_data),
-            'compressed_size_without_overhead': 0,
-            'overhead_bytes': 0
-        }
-        for m in self.compression_methods:
-            self.chunk_stats['method_usage'][m.type_id]=0
-
-    def _update_stats(self, chunk_stats: dict):
-        self.chunk_stats['total_chunks']+=1
-        if chunk_stats['compressed']:
-            self.chunk_stats['compressed_chunks']+=1
-            self.chunk_stats['method_usage'][chunk_stats['method_id']]+=1
-            self.chunk_stats['compressed_size_without_overhead']+= chunk_stats['compressed_size']
-            self.chunk_stats['overhead_bytes']+= chunk_stats['overhead']
-            self.chunk_stats['bytes_saved']+= chunk_stats['bytes_saved']
-        else:
-            self.chunk_stats['raw_chunks']+=1
+        self.chunk_stats= ChunkTotals(original_size=len(file_data))
+        self._probe_cache= {}
+
+    def _update_stats(self, all_chunk_stats):
+        """
+        Add the per-chunk stats of a whole compress() run in one pass,
+        after all chunks (sequential or parallel) have been produced.
+        """
+        compressed= [s for s in all_chunk_stats if s['compressed']]
+        stats= self.chunk_stats
+        stats.total_chunks+= len(all_chunk_stats)
+        stats.compressed_chunks+= len(compressed)
+        stats.raw_chunks+= len(all_chunk_stats)- len(compressed)
+        stats.compressed_size_without_overhead+= sum(s['compressed_size'] for s in compressed)
+        stats.overhead_bytes+= sum(s['overhead'] for s in compressed)
+        stats.bytes_saved+= sum(s['bytes_saved'] for s in compressed)
+
+        method_ids= np.fromiter((s['method_id'] for s in compressed), dtype=np.int64, count=len(compressed))
+        stats.method_usage+= np.bincount(method_ids, minlength=256)
+
+    def _report_chunk_stats(self):
+        """
+        chunk_stats as the dict returned to callers, with method_usage as a
+        dict of chunk counts for every loaded method ID.
+        """
+        usage= self.chunk_stats.method_usage
+        return dict(dataclasses.asdict(self.chunk_stats),
+                    method_usage={mid: int(usage[mid]) for mid in self.method_lookup})
 
     def _calculate_compression_stats(self, orig_size, comp_size, elapsed):
         if orig_size==0:
@@ -490,15 +1216,12 @@ class AdaptiveCompressor:
         if elapsed>0:
             throughput= orig_size/(1024*1024*elapsed)
         
-        if self.chunk_stats['compressed_chunks']>0:
-            cdata= self.chunk_stats['compressed_size_without_overhead']
-            overhead= self.chunk_stats['overhead_bytes']
-            # approximate
-            original_compressed_size=0
-            for mid, cnt in self.chunk_stats['method_usage'].items():
-                if mid!=255 and cnt>0:
-                    fraction= cnt/self.chunk_stats['total_chunks']
-                    original_compressed_size+= fraction*orig_size
+        if self.chunk_stats.compressed_chunks>0:
+            cdata= self.chunk_stats.compressed_size_without_overhead
+            overhead= self.chunk_stats.overhead_bytes
+            # approximate: each compressed chunk stands for an equal share of the input
+            compressed_count= self.chunk_stats.method_usage[:255].sum()
+            original_compressed_size= orig_size* compressed_count/ self.chunk_stats.total_chunks
             if original_compressed_size>0:
                 compression_efficiency= cdata/original_compressed_size
             else:
@@ -513,8 +1236,8 @@ class AdaptiveCompressor:
             'percent_reduction': pr,
             'elapsed_time': elapsed,
             'throughput_mb_per_sec': throughput,
-            'chunk_stats': self.chunk_stats,
-            'overhead_bytes': self.chunk_stats.get('overhead_bytes',0),
+            'chunk_stats': self._report_chunk_stats(),
+            'overhead_bytes': self.chunk_stats.overhead_bytes,
             'compression_efficiency': compression_efficiency
         }
         return stats
@@ -534,91 +1257,200 @@ class AdaptiveCompressor:
     # ----------------------------------------------------------------
     #   CHUNK SIZE + METHOD DECISION
     # ----------------------------------------------------------------
-    def _pick_best_chunk_and_method(self, data: bytes, position: int):
+    def _pick_best_chunk_and_method(self, data: bytes, position: int, probe_size: int=2048, top_k: int=2):
         """
-        For the next chunk, tries multiple chunk sizes from CHUNK_SIZE_CANDIDATES,
-        filters out methods that don't prefer that chunk size,
-        picks best ratio. Returns (best_chunk_size, best_method_id).
+        For the next chunk, tries multiple chunk sizes from chunk_size_candidates,
+        filters out methods that don't prefer that chunk size, picks best ratio.
+        Returns (best_chunk_size, best_method_id, compressed_data), where
+        compressed_data is the winning trial output (None for raw).
+
+        Methods are first ranked on a probe_size prefix at this position;
+        only the top_k ranked methods are run on each full candidate chunk.
+        Windows that look random are not tried at all, and the search stops at
+        the first size whose best ratio is no better than the size before it.
         """
         remain= len(data)- position
         best_csize= remain
         best_method_id=255
         best_ratio=1.0  # 1 => raw
+        best_cdata= None
+
+        # View the largest candidate; the smaller candidates and the probe
+        # are zero-copy prefixes of it (every method accepts buffer objects)
+        window= memoryview(data)[position: position+ self.chunk_size_candidates[0]]
 
-        for candidate in self.CHUNK_SIZE_CANDIDATES:
+        # Random data leaves no method anything to gain, so skip probing
+        # and trials and store the window raw
+        if self._looks_random(window):
+            return len(window), 255, None
+
+        ranking= self._rank_methods(window[:probe_size])
+
+        tried_sizes= set()
+        for candidate in self.chunk_size_candidates:
             if candidate> remain:
                 candidate= remain
             if candidate<=0:
                 break
-            chunk_data= data[position: position+candidate]
-
-            local_best_ratio=1.0
-            local_best_method=255
-
-            # only attempt methods that “prefer” this candidate chunk size
-            for method in self.compression_methods:
-                if method.type_id==255:
-                    # skip raw here; we compare against ratio=1.0
-                    continue
-
-                # check chunk-size preference
-                chunk_min, chunk_max= self.method_chunk_prefs.get(method.type_id,(1,999999999))
-                if not (chunk_min<= candidate<= chunk_max):
-                    continue
+            # candidates above the remainder all clamp to it; try it once
+            if candidate in tried_sizes:
+                continue
+            tried_sizes.add(candidate)
+            chunk_data= window[:candidate]
 
-                # then check method feasibility
-                if method.should_use(chunk_data):
-                    try:
-                        cdata= method.compress(chunk_data)
-                        overhead= self._calculate_fixed_overhead()
-                        ratio= (len(cdata)+ overhead)/ len(chunk_data)
-                        if ratio< local_best_ratio:
-                            local_best_ratio= ratio
-                            local_best_method= method.type_id
-                    except:
-                        pass
+            local_best_ratio, local_best_method, local_cdata= self._pick_best_method(chunk_data, ranking, top_k)
             
             if local_best_ratio< best_ratio:
                 best_ratio= local_best_ratio
                 best_csize= candidate
                 best_method_id= local_best_method
+                best_cdata= local_cdata
+            elif best_method_id!= 255:
+                # shrinking the chunk stopped paying off; smaller sizes
+                # would only repeat compressing the same prefix
+                break
 
         # if no method beat raw => entire remain as raw
         if best_method_id==255 and best_csize== remain:
-            return remain, 255
+            return remain, 255, None
         else:
-            return best_csize, best_method_id
+            return best_csize, best_method_id, best_cdata
+
+    def _looks_random(self, chunk_data) -> bool:
+        """
+        Cheap estimate from one statistics pass: a near-uniform byte
+        histogram without small adjacent deltas suggests no method can
+        compress the data. Since the histogram cannot see long-range
+        repeats, one fast method confirms it before the data is stored raw.
+        """
+        stats= chunk_stats(chunk_data)
+        if (stats.entropy<= self.RAW_ENTROPY_THRESHOLD
+                or stats.variation>= self.RAW_VARIATION_THRESHOLD):
+            return False
+        method= self._raw_check_method
+        if method is None:
+            return True
+        try:
+            cdata= method.compress(chunk_data)
+        except Exception:
+            return True
+        return len(cdata)+ self.chunk_overhead>= len(chunk_data)
+
+    def _pick_best_method(self, chunk_data: bytes, ranking, top_k: int=2):
+        """
+        Run the top_k methods from ranking that prefer this chunk size and
+        accept the data. Returns (best_ratio, best_method_id, compressed_data),
+        or (1.0, 255, None) if none beats raw.
+        Methods whose recent ratio is above RATIO_EWMA_CUTOFF are skipped.
+        """
+        best_ratio=1.0
+        best_method=255
+        best_cdata= None
+        ewma= self._ratio_ewma
+        alpha= self.RATIO_EWMA_ALPHA
+
+        # only attempt the best probed methods that “prefer” this chunk size
+        tried=0
+        for method_id in ranking:
+            if tried>= top_k:
+                break
+
+            # check chunk-size preference
+            chunk_min, chunk_max= self._chunk_pref_table[method_id]
+            if not (chunk_min<= len(chunk_data)<= chunk_max):
+                continue
+
+            # recently compressed (almost) nothing on this stream
+            if ewma[method_id]> self.RATIO_EWMA_CUTOFF:
+                continue
+
+            # then check method feasibility
+            method= self._method_table[method_id]
+            if method.should_use(chunk_data):
+                tried+=1
+                try:
+                    cdata= method.compress(chunk_data)
+                except Exception:
+                    continue
+                ewma[method_id]+= alpha* (len(cdata)/ len(chunk_data)- ewma[method_id])
+                ratio= (len(cdata)+ self.chunk_overhead)/ len(chunk_data)
+                if ratio< best_ratio:
+                    best_ratio= ratio
+                    best_method= method_id
+                    best_cdata= cdata
+
+        return best_ratio, best_method, best_cdata
+
+    def _rank_methods(self, probe: bytes):
+        """
+        Rank method IDs by how well each compresses the probe, best first.
+        Rankings are cached by a hash of the whole probe, so repeated data
+        reuses them without re-probing, while chunks that merely start
+        alike (padding, record headers) are probed on their own.
+        Every probe also feeds each method's recent-ratio average, so a
+        method skipped for poor ratios is re-admitted once it probes well.
+        Contiguous chunks of similar data (probe entropy within
+        RANKING_ENTROPY_TOLERANCE) reuse the last ranking without probing,
+        for at most RANKING_REUSE_CHUNKS chunks in a row.
+        """
+        # a digest, so keys never hold a view of the input
+        fingerprint= hashlib.blake2b(probe, digest_size=16).digest()
+        ranking= self._probe_cache.get(fingerprint)
+        if ranking is not None:
+            return ranking
+
+        entropy= chunk_stats(probe).entropy
+        if (self._last_ranking is not None
+                and self._ranking_reuses< self.RANKING_REUSE_CHUNKS
+                and abs(entropy- self._last_probe_entropy)<= self.RANKING_ENTROPY_TOLERANCE):
+            self._ranking_reuses+= 1
+            return self._last_ranking
+
+        # Probe output size per method; methods that fail stay at inf
+        ids= self._probe_method_ids
+        sizes= np.full(len(ids), np.inf)
+        for i, method_id in enumerate(ids.tolist()):
+            try:
+                sizes[i]= len(self._method_table[method_id].compress(probe))
+            except Exception:
+                pass
+
+        probed= np.isfinite(sizes)
+        if probed.any() and len(probe):
+            ewma= self._ratio_ewma
+            probed_ids= ids[probed]
+            ewma[probed_ids]+= self.RATIO_EWMA_ALPHA* (sizes[probed]/ len(probe)- ewma[probed_ids])
+
+        order= np.argsort(sizes, kind='stable')
+        ranking= ids[order[np.isfinite(sizes[order])]].tolist()
+        if len(self._probe_cache)>= self.PROBE_CACHE_SIZE:
+            self._probe_cache.clear()
+        self._probe_cache[fingerprint]= ranking
+        self._last_ranking= ranking
+        self._last_probe_entropy= entropy
+        self._ranking_reuses= 0
+        return ranking
 
     # ----------------------------------------------------------------
     #   CHUNK BUILDING
     # ----------------------------------------------------------------
     def _create_end_chunk(self):
         """
-        Creates an end chunk with package_type=0.
+        Returns the end chunk (package_type=0), built once per marker.
         """
-        chunk= bytearray()
-        chunk.extend(self.marker_bytes_aligned)
-        chunk.append(0)    # package_type=0
-        chunk.append(0)    # k_value=0
-        chunk.extend(struct.pack("<H", 0))  # used_bytes_in_chunk=0 (2 bytes, LE)
-        chunk.extend(struct.pack("<I", 0))  # original_length=0
-        chunk.extend(struct.pack("<I", 0))  # compressed_length=0
-        print(f"Created END chunk: marker={self.marker_bytes_aligned.hex()}")
-        return chunk
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Created END chunk: marker=%s", self.marker_bytes_aligned.hex())
+        return self._end_chunk
 
     def _create_chunk(self, package_type, k_value, used_bytes_in_chunk, original_length, compressed_data):
         """
         Creates a structured chunk with marker, package_type, k_value, etc.
         """
-        chunk = bytearray()
-        chunk.extend(self.marker_bytes_aligned)
-        chunk.append(package_type)
-        chunk.append(k_value)
-        chunk.extend(struct.pack("<I", used_bytes_in_chunk))
-        chunk.extend(struct.pack("<I", original_length))
-        chunk.extend(struct.pack("<I", len(compressed_data)))
-        chunk.extend(compressed_data)
-        return chunk
+        # One allocation and one copy of each part, without zero-filling
+        return b''.join((self.marker_bytes_aligned,
+                         _CHUNK_HEADER.pack(package_type, k_value, used_bytes_in_chunk,
+                                            original_length, len(compressed_data)),
+                         compressed_data))
 
     def _calculate_fixed_overhead(self):
         """
@@ -626,12 +1458,13 @@ class AdaptiveCompressor:
         marker + 1byte pkg_type + 1byte k_value + 4byte used_bytes + 
         +4byte original_length + 4byte compressed_length
         """
-        return len(self.marker_bytes_aligned)+1+1+4+4+4
+        return len(self.marker_bytes_aligned)+ CHUNK_HEADER_SIZE
 
-    def _process_chunk(self, chunk_data: bytes, method_id: int, chunk_index: int):
+    def _process_chunk(self, chunk_data: bytes, method_id: int, chunk_index: int, cdata: bytes=None):
         """
         Build a chunk with the chosen method (or raw if method_id=255),
-        returning (package_bytes, chunk_stats).
+        returning (package_bytes, chunk_stats). cdata is the method's output
+        for chunk_data if it was already computed during selection.
         """
         stats= {
             'compressed': False,
@@ -642,54 +1475,17 @@ class AdaptiveCompressor:
             'bytes_saved': 0
         }
 
-        # If no method or not found => raw
-        if method_id not in self.method_lookup or method_id==255:
-            # raw
-            stats['method_id']= 255
-            package_bytes= self._create_chunk(
-                package_type=255, 
-                k_value=0, 
-                used_bytes_in_chunk=len(chunk_data),
-                original_length=len(chunk_data),
-                compressed_data=chunk_data
-            )
-            return package_bytes, stats
-
-        # Otherwise attempt compression
-        method= self.method_lookup[method_id]
-        try:
-            cdata= method.compress(chunk_data)
-            overhead= self._calculate_fixed_overhead()
-            if len(cdata)+ overhead< len(chunk_data):
-                # compression is beneficial
-                stats['compressed']= True
-                stats['method_id']= method_id
-                stats['compressed_size']= len(cdata)
-                stats['overhead']= overhead
-                stats['bytes_saved']= len(chunk_data) - (len(cdata)+ overhead)
-                package_bytes= self._create_chunk(
-                    package_type=method_id, 
-                    k_value=0, # not used currently
-                    used_bytes_in_chunk=len(chunk_data),
-                    original_length=len(chunk_data),
-                    compressed_data=cdata
-                )
-                return package_bytes, stats
-            else:
-                # not beneficial => raw
-                stats['method_id']= 255
-                package_bytes= self._create_chunk(
-                    package_type=255,
-                    k_value=0,
-                    used_bytes_in_chunk=len(chunk_data),
-                    original_length=len(chunk_data),
-                    compressed_data=chunk_data
-                )
-                return package_bytes, stats
-        except Exception as e:
-            print(f"Error compressing chunk {chunk_index} with method {method_id}: {e}")
-            # fallback => raw
-            stats['method_id']=255
+        method= self._method_table[method_id]
+        if method is not None and method_id!=255 and cdata is None:
+            # only the method call can fail in unknown ways
+            try:
+                cdata= method.compress(chunk_data)
+            except Exception as e:
+                logger.warning("Error compressing chunk %d with method %d: %s", chunk_index, method_id, e)
+
+        # If no method, no output, or compression is not beneficial => raw
+        overhead= self.chunk_overhead
+        if method is None or method_id==255 or cdata is None or len(cdata)+ overhead>= len(chunk_data):
             package_bytes= self._create_chunk(
                 package_type=255,
                 k_value=0,
@@ -699,6 +1495,78 @@ class AdaptiveCompressor:
             )
             return package_bytes, stats
 
+        # compression is beneficial
+        stats['compressed']= True
+        stats['method_id']= method_id
+        stats['compressed_size']= len(cdata)
+        stats['overhead']= overhead
+        stats['bytes_saved']= len(chunk_data) - (len(cdata)+ overhead)
+        package_bytes= self._create_chunk(
+            package_type=method_id,
+            k_value=0, # not used currently
+            used_bytes_in_chunk=len(chunk_data),
+            original_length=len(chunk_data),
+            compressed_data=cdata
+        )
+        return package_bytes, stats
+
+
+# ----------------------------------------------------------------
+#   WORKER PROCESS HELPERS
+# ----------------------------------------------------------------
+# Per-worker state, set up once by _worker_init. Thread-local, so each
+# thread of a free-threaded pool gets its own compressor.
+_worker_state = threading.local()
+
+def _worker_init(compressor_cls, compression_levels, chunk_size_candidates):
+    """
+    Initializer for compression workers: builds one compressor (and its
+    methods) per worker, reused for every range it is given.
+    """
+    _worker_state.compressor = compressor_cls(compression_levels=compression_levels,
+                                              chunk_size_candidates=chunk_size_candidates)
+
+def _worker_compress_range(marker_bytes, marker_length, cdc_sizes, shm_name, path, data, start, end):
+    """
+    Compress file_data[start:end] in a worker. The range is read zero-copy
+    from the input file at path, mapped in the worker, or from the shared
+    memory block shm_name; or it is passed in as data when neither is
+    available.
+    Returns a list of (package_bytes, chunk_stats).
+    """
+    compressor = _worker_state.compressor
+    compressor._init_marker(marker_bytes, marker_length)
+    compressor.cdc_sizes = cdc_sizes
+    # workers never run _init_stats, so drop rankings from earlier ranges
+    # here; otherwise the cache grows for the life of the pool
+    compressor._probe_cache = {}
+    if data is not None:
+        return list(compressor._compress_range(data))
+
+    if path is not None:
+        with open(path, "rb") as f:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(source)
+    else:
+        source = shared_memory.SharedMemory(name=shm_name)
+        buf = source.buf
+    try:
+        # the chunk loop keeps no view of the range once it is done, so
+        # the view is released before the mapping is closed
+        with buf[start:end] as view:
+            return list(compressor._compress_range(view))
+    finally:
+        if path is not None:
+            buf.release()
+        source.close()
+
+def _worker_decode_chunk(pkg_type, payload, orig_len):
+    """
+    Decode one chunk payload in a worker.
+    """
+    block = _worker_state.compressor._decode_chunk(pkg_type, payload, orig_len)
+    # a zero-scratch view cannot be pickled back
+    return bytes(block) if isinstance(block, memoryview) else block
 
 if __name__=="__main__":
     def quick_test():
@@ -714,13 +1582,13 @@ if __name__=="__main__":
         with open(test_file,"wb") as f:
             f.write(data)
 
-        c= AdaptiveCompressor()
-        c.enable_multithreading()
-        stats= c.compress(test_file,out_file)
-        print("Compression stats:", stats)
+        with AdaptiveCompressor() as c:
+            c.enable_multithreading()
+            stats= c.compress(test_file,out_file)
+            print("Compression stats:", stats)
 
-        ds= c.decompress(out_file, dec_file)
-        print("Decompression stats:", ds)
+            ds= c.decompress(out_file, dec_file)
+            print("Decompression stats:", ds)
 
         with open(dec_file,"rb") as f:
             new_data= f.read()
@@ -1,11 +1,13 @@
 import zlib
 import bz2
 import lzma
-import numpy as np
 import sys
 import os
+import logging
 
-from compression_methods import CompressionMethod
+from compression_methods import CompressionMethod, calculate_entropy, chunk_stats
+
+logger = logging.getLogger(__name__)
 
 # Try to import zstandard (Zstd)
 try:
@@ -13,7 +15,7 @@ try:
     HAS_ZSTD = True
 except ImportError:
     HAS_ZSTD = False
-    print("zstd library not available. Zstandard compression will be disabled.")
+    logger.info("zstd library not available. Zstandard compression will be disabled.")
 
 # Try to import lz4.frame (LZ4)
 try:
@@ -21,7 +23,7 @@ try:
     HAS_LZ4 = True
 except ImportError:
     HAS_LZ4 = False
-    print("lz4 library not available. LZ4 compression will be disabled.")
+    logger.info("lz4 library not available. LZ4 compression will be disabled.")
 
 # Try to import Brotli and LZHAM from an external file (brotli_lzham_compression.py)
 try:
@@ -29,15 +31,15 @@ try:
         from brotli_lzham_compression import BrotliCompression, HAS_BROTLI
         from brotli_lzham_compression import LZHAMCompression, HAS_LZHAM
         if HAS_BROTLI:
-            print("Added Brotli compression")
+            logger.info("Added Brotli compression")
         if HAS_LZHAM:
-            print("Added LZHAM compression")
+            logger.info("Added LZHAM compression")
     else:
         HAS_BROTLI = False
         HAS_LZHAM = False
-        print("brotli_lzham_compression.py not found in current directory")
+        logger.info("brotli_lzham_compression.py not found in current directory")
 except ImportError as e:
-    print(f"Error importing from brotli_lzham_compression: {e}")
+    logger.warning("Error importing from brotli_lzham_compression: %s", e)
     HAS_BROTLI = False
     HAS_LZHAM = False
 
@@ -45,39 +47,32 @@ except ImportError as e:
 # Utility functions for choosing whether to compress
 # ---------------------------------------------------------------------
 
-def calculate_entropy(data: bytes) -> float:
-    """
-    Compute approximate Shannon entropy for 'data'.
-    """
-    if not data:
-        return 0.0
-    counts = np.bincount(bytearray(data), minlength=256)
-    probs = counts / len(data)
-    probs = probs[probs > 0]
-    return -np.sum(probs * np.log2(probs))
-
 def calculate_text_ratio(data: bytes) -> float:
     """
     Estimate fraction of bytes that are typical text characters.
     """
-    if not data:
-        return 0.0
-    text_chars = sum(1 for b in data if 32 <= b <= 127 or b in (9, 10, 13))
-    return text_chars / len(data)
+    return chunk_stats(data).text
 
 # ---------------------------------------------------------------------
 # DEFLATE
 # ---------------------------------------------------------------------
 class DeflateCompression(CompressionMethod):
+    releases_gil = True
+
+    def __init__(self, level=9):
+        self.level = level
+    
     @property
     def type_id(self):
         return 5
     
-    def compress(self, data, level=9):
+    def compress(self, data, level=None):
         if not data:
             return b''
+        if level is None:
+            level = self.level
         compressed = zlib.compress(data, level=level)
-        print(f"DEFLATE compression (lvl={level}): {len(data)} -> {len(compressed)} bytes")
+        logger.debug("DEFLATE compression (lvl=%s): %s -> %s bytes", level, len(data), len(compressed))
         return compressed
     
     def decompress(self, data, original_length):
@@ -89,10 +84,10 @@ class DeflateCompression(CompressionMethod):
                 decompressed = decompressed[:original_length]
             elif len(decompressed) < original_length:
                 decompressed += bytes(original_length - len(decompressed))
-            print(f"DEFLATE decompression: {len(data)} -> {len(decompressed)} bytes")
+            logger.debug("DEFLATE decompression: %s -> %s bytes", len(data), len(decompressed))
             return decompressed
         except Exception as e:
-            print(f"DEFLATE decompress error: {e}")
+            logger.warning("DEFLATE decompress error: %s", e)
             return bytes(original_length)
     
     def should_use(self, data: bytes, threshold=0.9) -> bool:
@@ -110,15 +105,22 @@ class DeflateCompression(CompressionMethod):
 # BZIP2
 # ---------------------------------------------------------------------
 class Bzip2Compression(CompressionMethod):
+    releases_gil = True
+
+    def __init__(self, level=9):
+        self.level = level
+    
     @property
     def type_id(self):
         return 6
     
-    def compress(self, data, level=9):
+    def compress(self, data, level=None):
         if not data:
             return b''
+        if level is None:
+            level = self.level
         compressed = bz2.compress(data, compresslevel=level)
-        print(f"BZIP2 compression (lvl={level}): {len(data)} -> {len(compressed)} bytes")
+        logger.debug("BZIP2 compression (lvl=%s): %s -> %s bytes", level, len(data), len(compressed))
         return compressed
     
     def decompress(self, data, original_length):
@@ -130,10 +132,10 @@ class Bzip2Compression(CompressionMethod):
                 decompressed = decompressed[:original_length]
             elif len(decompressed) < original_length:
                 decompressed += bytes(original_length - len(decompressed))
-            print(f"BZIP2 decompression: {len(data)} -> {len(decompressed)} bytes")
+            logger.debug("BZIP2 decompression: %s -> %s bytes", len(data), len(decompressed))
             return decompressed
         except Exception as e:
-            print(f"BZIP2 decompress error: {e}")
+            logger.warning("BZIP2 decompress error: %s", e)
             return bytes(original_length)
     
     def should_use(self, data: bytes, threshold=0.9) -> bool:
@@ -154,8 +156,14 @@ class Bzip2Compression(CompressionMethod):
 # ---------------------------------------------------------------------
 class LZMACompression(CompressionMethod):
     """
-    LZMA with a custom filter chain. We do NOT specify preset simultaneously.
+    LZMA with a custom filter chain. The level is given as the filter's
+    preset (not to LZMACompressor, which rejects preset with filters).
     """
+    releases_gil = True
+
+    def __init__(self, level=6):
+        self.level = level
+    
     @property
     def type_id(self):
         return 7
@@ -164,10 +172,11 @@ class LZMACompression(CompressionMethod):
         if not data:
             return b''
         try:
-            # Custom filter without specifying preset
+            # Custom filter: preset level with a fixed dictionary size
             filters = [
                 {
                     "id": lzma.FILTER_LZMA2,
+                    "preset": self.level,
                     "dict_size": 1 << 24,  # 16 MB dictionary
                 }
             ]
@@ -178,10 +187,10 @@ class LZMACompression(CompressionMethod):
             )
             compressed = compressor.compress(data)
             compressed += compressor.flush()
-            print(f"LZMA compression (dict=16MB): {len(data)} -> {len(compressed)} bytes")
+            logger.debug("LZMA compression (lvl=%s, dict=16MB): %s -> %s bytes", self.level, len(data), len(compressed))
             return compressed
         except Exception as e:
-            print(f"LZMA compress error: {e}")
+            logger.warning("LZMA compress error: %s", e)
             return data
     
     def decompress(self, data, original_length):
@@ -193,10 +202,10 @@ class LZMACompression(CompressionMethod):
                 decompressed = decompressed[:original_length]
             elif len(decompressed) < original_length:
                 decompressed += bytes(original_length - len(decompressed))
-            print(f"LZMA decompression: {len(data)} -> {len(decompressed)} bytes")
+            logger.debug("LZMA decompression: %s -> %s bytes", len(data), len(decompressed))
             return decompressed
         except Exception as e:
-            print(f"LZMA decompress error: {e}")
+            logger.warning("LZMA decompress error: %s", e)
             return bytes(original_length)
     
     def should_use(self, data: bytes, threshold=0.9) -> bool:
@@ -217,6 +226,11 @@ class LZMACompression(CompressionMethod):
 # ---------------------------------------------------------------------
 if HAS_ZSTD:
     class ZstdCompression(CompressionMethod):
+        releases_gil = True
+
+        def __init__(self, level=19):
+            self.level = level
+        
         @property
         def type_id(self):
             return 8
@@ -225,12 +239,12 @@ if HAS_ZSTD:
             if not data:
                 return b''
             try:
-                compressor = zstd.ZstdCompressor(level=19)  # near max
+                compressor = zstd.ZstdCompressor(level=self.level)
                 compressed = compressor.compress(data)
-                print(f"ZStd compression (lvl=19): {len(data)} -> {len(compressed)} bytes")
+                logger.debug("ZStd compression (lvl=%s): %s -> %s bytes", self.level, len(data), len(compressed))
                 return compressed
             except Exception as e:
-                print(f"Zstd compress error: {e}")
+                logger.warning("Zstd compress error: %s", e)
                 return data
         
         def decompress(self, data, original_length):
@@ -243,10 +257,10 @@ if HAS_ZSTD:
                     decompressed = decompressed[:original_length]
                 elif len(decompressed) < original_length:
                     decompressed += bytes(original_length - len(decompressed))
-                print(f"ZStd decompression: {len(data)} -> {len(decompressed)} bytes")
+                logger.debug("ZStd decompression: %s -> %s bytes", len(data), len(decompressed))
                 return decompressed
             except Exception as e:
-                print(f"Zstd decompress error: {e}")
+                logger.warning("Zstd decompress error: %s", e)
                 return bytes(original_length)
         
         def should_use(self, data: bytes, threshold=0.9) -> bool:
@@ -265,6 +279,11 @@ if HAS_ZSTD:
 # ---------------------------------------------------------------------
 if HAS_LZ4:
     class LZ4Compression(CompressionMethod):
+        releases_gil = True
+
+        def __init__(self, level=9):
+            self.level = level
+
         @property
         def type_id(self):
             return 9
@@ -273,11 +292,11 @@ if HAS_LZ4:
             if not data:
                 return b''
             try:
-                compressed = lz4.frame.compress(data, compression_level=9)
-                print(f"LZ4 compression (lvl=9): {len(data)} -> {len(compressed)} bytes")
+                compressed = lz4.frame.compress(data, compression_level=self.level)
+                logger.debug("LZ4 compression (lvl=%s): %s -> %s bytes", self.level, len(data), len(compressed))
                 return compressed
             except Exception as e:
-                print(f"LZ4 compress error: {e}")
+                logger.warning("LZ4 compress error: %s", e)
                 return data
         
         def decompress(self, data, original_length):
@@ -289,10 +308,10 @@ if HAS_LZ4:
                     decompressed = decompressed[:original_length]
                 elif len(decompressed) < original_length:
                     decompressed += bytes(original_length - len(decompressed))
-                print(f"LZ4 decompression: {len(data)} -> {len(decompressed)} bytes")
+                logger.debug("LZ4 decompression: %s -> %s bytes", len(data), len(decompressed))
                 return decompressed
             except Exception as e:
-                print(f"LZ4 decompress error: {e}")
+                logger.warning("LZ4 decompress error: %s", e)
                 return bytes(original_length)
         
         def should_use(self, data: bytes, threshold=0.9) -> bool:
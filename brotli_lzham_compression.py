@@ -1,5 +1,8 @@
-import numpy as np
-from compression_methods import CompressionMethod
+import logging
+
+from compression_methods import CompressionMethod, calculate_entropy, chunk_stats
+
+logger = logging.getLogger(__name__)
 
 # Try to import additional compression libraries
 try:
@@ -7,14 +10,14 @@ try:
     HAS_BROTLI = True
 except ImportError:
     HAS_BROTLI = False
-    print("brotli library not available. Brotli compression will be disabled.")
+    logger.info("brotli library not available. Brotli compression will be disabled.")
 
 try:
     import lzham
     HAS_LZHAM = True
 except ImportError:
     HAS_LZHAM = False
-    print("pylzham library not available. LZHAM compression will be disabled.")
+    logger.info("pylzham library not available. LZHAM compression will be disabled.")
 
 
 # Brotli compression if available
@@ -23,6 +26,11 @@ if HAS_BROTLI:
         """
         Brotli compression method (used by Google for web compression)
         """
+        releases_gil = True
+
+        def __init__(self, quality=11):
+            self.quality = quality
+        
         @property
         def type_id(self):
             return 10
@@ -41,12 +49,12 @@ if HAS_BROTLI:
                 return b''
             
             try:
-                # Use Brotli with quality level 11 (max compression)
-                compressed = brotli.compress(data, quality=11)
-                print(f"Brotli compression: {len(data)} bytes -> {len(compressed)} bytes")
+                # Quality 11 is max compression
+                compressed = brotli.compress(data, quality=self.quality)
+                logger.debug("Brotli compression: %s bytes -> %s bytes", len(data), len(compressed))
                 return compressed
             except Exception as e:
-                print(f"Brotli compression error: {e}")
+                logger.warning("Brotli compression error: %s", e)
                 # Fall back to no compression
                 return data
         
@@ -67,24 +75,24 @@ if HAS_BROTLI:
             try:
                 # Use Brotli to decompress
                 decompressed = brotli.decompress(data)
-                print(f"Brotli decompression: {len(data)} bytes -> {len(decompressed)} bytes")
+                logger.debug("Brotli decompression: %s bytes -> %s bytes", len(data), len(decompressed))
                 
                 # Ensure we have the right size
                 if len(decompressed) != original_length:
                     if len(decompressed) > original_length:
-                        print(f"Warning: Brotli decompressed size ({len(decompressed)}) larger than original ({original_length})")
+                        logger.warning("Brotli decompressed size (%s) larger than original (%s)", len(decompressed), original_length)
                         decompressed = decompressed[:original_length]
                     else:
-                        print(f"Warning: Brotli decompressed size ({len(decompressed)}) smaller than original ({original_length})")
+                        logger.warning("Brotli decompressed size (%s) smaller than original (%s)", len(decompressed), original_length)
                         # Pad with zeros if needed
                         missing = original_length - len(decompressed)
-                        print(f"Padding with {missing} zero bytes")
+                        logger.debug("Padding with %s zero bytes", missing)
                         decompressed = decompressed + bytes(missing)
                 
                 return decompressed
             
             except Exception as e:
-                print(f"Brotli decompression error: {e}")
+                logger.warning("Brotli decompression error: %s", e)
                 # Return zeros as a fallback
                 return bytes(original_length)
         
@@ -111,30 +119,14 @@ if HAS_BROTLI:
                 return False
             
             # Check if it's likely text data
-            text_chars = sum(1 for b in data if 32 <= b <= 127 or b in (9, 10, 13))
-            text_ratio = text_chars / len(data) if data else 0
+            text_ratio = chunk_stats(data).text
             
             # Brotli is optimized for text content
             return text_ratio > 0.6
         
         def _calculate_entropy(self, data):
             """Calculate Shannon entropy of the data"""
-            if not data:
-                return 0.0
-                
-            # Count byte frequencies
-            counts = np.bincount(bytearray(data), minlength=256)
-            
-            # Calculate probabilities for each byte value
-            probabilities = counts / len(data)
-            
-            # Filter out zero probabilities to avoid log(0)
-            probabilities = probabilities[probabilities > 0]
-            
-            # Calculate entropy: -sum(p * log2(p))
-            entropy = -np.sum(probabilities * np.log2(probabilities))
-            
-            return entropy
+            return calculate_entropy(data)
 
 
 # LZHAM compression if available
@@ -163,10 +155,10 @@ if HAS_LZHAM:
             try:
                 # Use max compression level
                 compressed = lzham.compress(data)
-                print(f"LZHAM compression: {len(data)} bytes -> {len(compressed)} bytes")
+                logger.debug("LZHAM compression: %s bytes -> %s bytes", len(data), len(compressed))
                 return compressed
             except Exception as e:
-                print(f"LZHAM compression error: {e}")
+                logger.warning("LZHAM compression error: %s", e)
                 # Fall back to no compression
                 return data
         
@@ -187,24 +179,24 @@ if HAS_LZHAM:
             try:
                 # Use LZHAM to decompress
                 decompressed = lzham.decompress(data, decompressed_size=original_length)
-                print(f"LZHAM decompression: {len(data)} bytes -> {len(decompressed)} bytes")
+                logger.debug("LZHAM decompression: %s bytes -> %s bytes", len(data), len(decompressed))
                 
                 # Ensure we have the right size
                 if len(decompressed) != original_length:
                     if len(decompressed) > original_length:
-                        print(f"Warning: LZHAM decompressed size ({len(decompressed)}) larger than original ({original_length})")
+                        logger.warning("LZHAM decompressed size (%s) larger than original (%s)", len(decompressed), original_length)
                         decompressed = decompressed[:original_length]
                     else:
-                        print(f"Warning: LZHAM decompressed size ({len(decompressed)}) smaller than original ({original_length})")
+                        logger.warning("LZHAM decompressed size (%s) smaller than original (%s)", len(decompressed), original_length)
                         # Pad with zeros if needed
                         missing = original_length - len(decompressed)
-                        print(f"Padding with {missing} zero bytes")
+                        logger.debug("Padding with %s zero bytes", missing)
                         decompressed = decompressed + bytes(missing)
                 
                 return decompressed
             
             except Exception as e:
-                print(f"LZHAM decompression error: {e}")
+                logger.warning("LZHAM decompression error: %s", e)
                 # Return zeros as a fallback
                 return bytes(original_length)
         
@@ -235,22 +227,7 @@ if HAS_LZHAM:
         
         def _calculate_entropy(self, data):
             """Calculate Shannon entropy of the data"""
-            if not data:
-                return 0.0
-                
-            # Count byte frequencies
-            counts = np.bincount(bytearray(data), minlength=256)
-            
-            # Calculate probabilities for each byte value
-            probabilities = counts / len(data)
-            
-            # Filter out zero probabilities to avoid log(0)
-            probabilities = probabilities[probabilities > 0]
-            
-            # Calculate entropy: -sum(p * log2(p))
-            entropy = -np.sum(probabilities * np.log2(probabilities))
-            
-            return entropy
+            return calculate_entropy(data)
 
 # Add stub implementation for when LZHAM is not available
 if not HAS_LZHAM:
@@ -272,7 +249,7 @@ if not HAS_LZHAM:
             Returns:
                 bytes: Original data
             """
-            print("LZHAM compression not available, returning data as-is")
+            logger.info("LZHAM compression not available, returning data as-is")
             return data
         
         def decompress(self, data, original_length):
@@ -286,12 +263,12 @@ if not HAS_LZHAM:
             Returns:
                 bytes: Original data
             """
-            print("LZHAM decompression not available, using fallback")
+            logger.info("LZHAM decompression not available, using fallback")
             
             # For case when we're trying to decompress LZHAM data without the library,
             # this is likely to fail, so return zeros as a fallback
             if len(data) != original_length:
-                print(f"Warning: Cannot properly decompress LZHAM data without pylzham")
+                logger.warning("Cannot properly decompress LZHAM data without pylzham")
                 return bytes(original_length)
             return data
         
@@ -6,6 +6,9 @@ This provides a compatibility layer for different compression libraries.
 import os
 import sys
 import importlib
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Check for available compression libraries
 HAS_BROTLI = False
@@ -57,13 +60,22 @@ def check_compression_libraries():
         'lz4': HAS_LZ4
     }
 
-def get_compatible_methods():
+def get_compatible_methods(compression_levels=None):
     """
     Get a list of compression methods that are compatible with the current environment.
     
+    Args:
+        compression_levels (dict, optional): Levels by method name
+            ('deflate', 'bzip2', 'lzma', 'zstd', 'lz4', 'brotli'); library defaults otherwise
+    
     Returns:
         list: List of compatible compression method instances
     """
+    levels = compression_levels or {}
+    
+    def level_kwargs(name, keyword='level'):
+        return {keyword: levels[name]} if name in levels else {}
+    
     # Import the base methods that are always available
     from compression_methods import (
         RLECompression,
@@ -95,24 +107,24 @@ def get_compatible_methods():
         )
         
         # Add standard library methods
-        methods.append(DeflateCompression())
-        methods.append(Bzip2Compression())
-        methods.append(LZMACompression())
+        methods.append(DeflateCompression(**level_kwargs('deflate')))
+        methods.append(Bzip2Compression(**level_kwargs('bzip2')))
+        methods.append(LZMACompression(**level_kwargs('lzma')))
         
         # Try to add ZStandard
         if libs['zstd']:
             from advanced_compression import ZstdCompression
-            methods.append(ZstdCompression())
+            methods.append(ZstdCompression(**level_kwargs('zstd')))
         
         # Try to add LZ4
         if libs['lz4']:
             from advanced_compression import LZ4Compression
-            methods.append(LZ4Compression())
+            methods.append(LZ4Compression(**level_kwargs('lz4')))
         
         # Try to add Brotli
         if libs['brotli']:
             from brotli_lzham_compression import BrotliCompression
-            methods.append(BrotliCompression())
+            methods.append(BrotliCompression(**level_kwargs('brotli', 'quality')))
         
         # Try to add LZHAM
         if libs['lzham']:
@@ -120,7 +132,7 @@ def get_compatible_methods():
             methods.append(LZHAMCompression())
             
     except ImportError as e:
-        print(f"Warning: Some advanced compression methods couldn't be imported: {e}")
+        logger.warning("Some advanced compression methods couldn't be imported: %s", e)
     
     return methods
 
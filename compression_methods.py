@@ -1,13 +1,153 @@
 import heapq
-from collections import Counter, defaultdict
+import logging
+from collections import defaultdict, namedtuple
 import numpy as np
 from abc import ABC, abstractmethod
 
+# Try to import numba for the fused chunk statistics pass
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+logger = logging.getLogger(__name__)
+
+
+# Adjacent byte pairs sampled for the repetition and variation ratios
+STATS_SAMPLE_SIZE = 1000
+
+# Per-chunk statistics used by the should_use heuristics:
+#   entropy     Shannon entropy of the whole chunk (bits per byte)
+#   repetition  fraction of sampled adjacent pairs that are equal
+#   variation   fraction of sampled adjacent pairs differing by less than 32
+#   text        fraction of the whole chunk that is printable ASCII/whitespace
+ChunkStats = namedtuple('ChunkStats', ['entropy', 'repetition', 'variation', 'text'])
+
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _chunk_stats_nb(a, step):
+        """
+        One native pass over a (uint8 array) for the byte histogram and
+        text count, plus the strided adjacent-pair counts.
+        """
+        counts = np.zeros(256, dtype=np.int64)
+        text = 0
+        for i in range(len(a)):
+            b = a[i]
+            counts[b] += 1
+            if (b >= 32 and b <= 127) or b == 9 or b == 10 or b == 13:
+                text += 1
+        
+        repeats = 0
+        small_deltas = 0
+        for i in range(0, len(a) - 1, step):
+            d = np.int64(a[i]) - np.int64(a[i + 1])
+            if d == 0:
+                repeats += 1
+            if abs(d) < 32:
+                small_deltas += 1
+        
+        entropy = 0.0
+        for c in counts:
+            if c > 0:
+                p = c / len(a)
+                entropy -= p * np.log2(p)
+        return entropy, repeats, small_deltas, text
+    
+    # Compile (or load from cache) up front so the first chunk does not pay for it
+    _chunk_stats_nb(np.zeros(256, dtype=np.uint8), 1)
+
+
+def _uniform_stats(byte, n, step):
+    """
+    Statistics for n copies of one byte value: zero entropy, and every
+    sampled adjacent pair is a repeat.
+    """
+    pairs = len(range(0, n - 1, step))
+    is_text = 32 <= byte <= 127 or byte in (9, 10, 13)
+    return 0.0, pairs, pairs, n if is_text else 0
+
+
+def _chunk_stats_numpy(a, step):
+    """
+    NumPy version of the statistics pass: the text count comes from the
+    byte histogram and the adjacent pairs from two strided views.
+    """
+    counts = np.bincount(a, minlength=256)
+    p = counts[counts > 0] / len(a)
+    entropy = float(-np.dot(p, np.log2(p)))
+    
+    text = int(counts[32:128].sum() + counts[9] + counts[10] + counts[13])
+    
+    # Pairs (a[i], a[i + 1]) for i in range(0, len(a) - 1, step)
+    deltas = a[:-1:step].astype(np.int16) - a[1::step]
+    repeats = int(np.count_nonzero(deltas == 0))
+    small_deltas = int(np.count_nonzero(np.abs(deltas) < 32))
+    return entropy, repeats, small_deltas, text
+
+
+# The last chunk analyzed; several methods' should_use see the same chunk object
+_last_stats = (None, None)
+
+def chunk_stats(data) -> ChunkStats:
+    """
+    Compute all should_use statistics for 'data' in a single pass.
+    The result for the most recent chunk object is reused, so methods
+    checked one after another on the same chunk share one analysis.
+    """
+    global _last_stats
+    last_data, last_stats = _last_stats
+    if last_data is data:
+        return last_stats
+    
+    n = len(data)
+    if n == 0:
+        stats = ChunkStats(0.0, 0.0, 0.0, 0.0)
+    else:
+        sample_size = min(STATS_SAMPLE_SIZE, n)
+        step = max(1, n // sample_size)
+        a = np.frombuffer(data, dtype=np.uint8)
+        head = a[:64]
+        if (head == head[0]).all() and (a == head[0]).all():
+            # A run of a single byte value needs no histogram
+            entropy, repeats, small_deltas, text = _uniform_stats(int(head[0]), n, step)
+        elif HAS_NUMBA:
+            entropy, repeats, small_deltas, text = _chunk_stats_nb(a, step)
+        else:
+            entropy, repeats, small_deltas, text = _chunk_stats_numpy(a, step)
+        pairs = max(1, sample_size - 1)
+        stats = ChunkStats(float(entropy), repeats / pairs, small_deltas / pairs, text / n)
+    
+    _last_stats = (data, stats)
+    return stats
+
+
+def clear_chunk_stats_cache():
+    """
+    Drop the cached statistics and their reference to the last chunk, so
+    a chunk that is a view of a mapping no longer keeps it open.
+    """
+    global _last_stats
+    _last_stats = (None, None)
+
+
+def calculate_entropy(data) -> float:
+    """
+    Compute the Shannon entropy (bits per byte) of 'data'.
+    """
+    return chunk_stats(data).entropy
+
 
 class CompressionMethod(ABC):
     """
     Abstract base class for all compression methods
     """
+    # True if decompress() holds the GIL only briefly (C code that releases
+    # it, or a plain copy), so that chunks can be decoded on threads
+    releases_gil = False
+
     @property
     @abstractmethod
     def type_id(self):
@@ -88,30 +228,26 @@ class RLECompression(CompressionMethod):
         if not data:
             return b''
         
-        compressed = bytearray()
-        current_byte = data[0]
-        count = 1
+        a = np.frombuffer(data, dtype=np.uint8)
         
-        for i in range(1, len(data)):
-            if data[i] == current_byte and count < 255:
-                count += 1
-            else:
-                # Store the current run
-                compressed.append(current_byte)
-                compressed.append(count)
-                
-                # Start a new run
-                current_byte = data[i]
-                count = 1
+        # Runs of equal bytes: start offsets and lengths
+        starts = np.flatnonzero(a[1:] != a[:-1]) + 1
+        starts = np.concatenate(([0], starts))
+        lengths = np.diff(np.append(starts, len(a)))
+        
+        # Runs longer than 255 are split into (byte, 255) pairs plus the rest
+        pairs_per_run = (lengths + 254) // 255
+        counts = np.full(int(pairs_per_run.sum()), 255, dtype=np.uint8)
+        counts[np.cumsum(pairs_per_run) - 1] = lengths - 255 * (pairs_per_run - 1)
         
-        # Don't forget the last run
-        compressed.append(current_byte)
-        compressed.append(count)
+        compressed = np.empty(2 * len(counts), dtype=np.uint8)
+        compressed[0::2] = np.repeat(a[starts], pairs_per_run)
+        compressed[1::2] = counts
         
         # Debug info
-        print(f"RLE compression: {len(data)} bytes -> {len(compressed)} bytes")
+        logger.debug("RLE compression: %s bytes -> %s bytes", len(data), len(compressed))
         
-        return bytes(compressed)
+        return compressed.tobytes()
     
     def decompress(self, data, original_length):
         """
@@ -127,26 +263,23 @@ class RLECompression(CompressionMethod):
         if not data:
             return b''
         
-        decompressed = bytearray()
-        
-        for i in range(0, len(data), 2):
-            if i + 1 < len(data):  # Make sure we have a pair
-                byte_val = data[i]
-                count = data[i + 1]
-                decompressed.extend([byte_val] * count)
+        # Expand all complete (byte, count) pairs at once
+        a = np.frombuffer(data, dtype=np.uint8)
+        pairs = a[:len(a) - len(a) % 2]
+        decompressed = bytearray(np.repeat(pairs[0::2], pairs[1::2]).tobytes())
         
         # Debug output
-        print(f"RLE decompression: {len(data)} bytes -> {len(decompressed)} bytes")
+        logger.debug("RLE decompression: %s bytes -> %s bytes", len(data), len(decompressed))
         
         # Ensure we don't exceed the original length
         if len(decompressed) > original_length:
-            print(f"Warning: RLE decompressed size ({len(decompressed)}) larger than original ({original_length})")
+            logger.warning("RLE decompressed size (%s) larger than original (%s)", len(decompressed), original_length)
             decompressed = decompressed[:original_length]
         elif len(decompressed) < original_length:
-            print(f"Warning: RLE decompressed size ({len(decompressed)}) smaller than original ({original_length})")
+            logger.warning("RLE decompressed size (%s) smaller than original (%s)", len(decompressed), original_length)
             # Pad with zeros if needed
             missing = original_length - len(decompressed)
-            print(f"Padding with {missing} zero bytes")
+            logger.debug("Padding with %s zero bytes", missing)
             decompressed.extend([0] * missing)
         
         return bytes(decompressed)
@@ -165,16 +298,8 @@ class RLECompression(CompressionMethod):
         if len(data) < 4:  # Too small for effective RLE
             return False
         
-        # Quick sampling to estimate repetitions
-        sample_size = min(1000, len(data))
-        sample_step = max(1, len(data) // sample_size)
-        
-        repeats = 0
-        for i in range(0, len(data) - 1, sample_step):
-            if data[i] == data[i + 1]:
-                repeats += 1
-        
-        repeat_ratio = repeats / (sample_size - 1)
+        # Sampled fraction of equal adjacent bytes
+        repeat_ratio = chunk_stats(data).repetition
         
         # If more than 30% of adjacent bytes are the same, RLE might be effective
         return repeat_ratio > 0.3
@@ -330,14 +455,14 @@ class DictionaryCompression(CompressionMethod):
         sample_size = min(1000, len(data))
         sequence_length = 3
         
-        sequences = set()
-        for i in range(0, min(len(data) - sequence_length, sample_size)):
-            seq = data[i:i + sequence_length]
-            sequences.add(seq)
+        # Distinct 3-byte sequences starting in the sample: pack each
+        # triple into one integer from shifted views of the same array
+        sample = np.frombuffer(data, dtype=np.uint8)[:min(len(data) - sequence_length, sample_size) + sequence_length - 1]
+        sequences = (sample[:-2].astype(np.uint32) << 16) | (sample[1:-1].astype(np.uint32) << 8) | sample[2:]
         
         # If there are many repeated sequences, dictionary compression might be effective
         # Calculate ratio of unique sequences to total sequences
-        unique_ratio = len(sequences) / sample_size
+        unique_ratio = len(np.unique(sequences)) / sample_size
         
         # If less than 80% of sequences are unique, dictionary compression might be effective
         return unique_ratio < 0.8
@@ -364,10 +489,10 @@ class HuffmanCompression(CompressionMethod):
         if not data:
             return b''
         
-        # Count frequencies - ensure we're working with byte values (0-255)
-        freq = Counter()
-        for b in data:
-            freq[b & 0xFF] += 1  # Ensure valid byte range with bitwise AND
+        # Count byte frequencies with a C-level histogram, keeping only
+        # the byte values that occur (in increasing order)
+        counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+        freq = {int(b): int(counts[b]) for b in np.flatnonzero(counts)}
         
         # Build Huffman tree
         tree = self._build_huffman_tree(freq)
@@ -562,12 +687,7 @@ class HuffmanCompression(CompressionMethod):
         if len(data) < 100:  # Too small for effective Huffman coding
             return False
         
-        # Calculate entropy
-        freqs = Counter(data)
-        entropy = 0
-        for count in freqs.values():
-            p = count / len(data)
-            entropy -= p * np.log2(p)
+        entropy = calculate_entropy(data)
         
         # If entropy is low, Huffman coding might be effective
         # Max entropy for bytes is 8 bits
@@ -595,17 +715,16 @@ class DeltaCompression(CompressionMethod):
         if not data:
             return b''
         
-        compressed = bytearray()
+        a = np.frombuffer(data, dtype=np.uint8)
+        compressed = np.empty_like(a)
         
         # Store the first byte as-is
-        compressed.append(data[0])
+        compressed[0] = a[0]
         
-        # Store deltas for the rest
-        for i in range(1, len(data)):
-            delta = (data[i] - data[i-1]) & 0xFF  # Wrap around for byte arithmetic
-            compressed.append(delta)
+        # Store deltas for the rest (uint8 arithmetic wraps around)
+        np.subtract(a[1:], a[:-1], out=compressed[1:])
         
-        return bytes(compressed)
+        return compressed.tobytes()
     
     def decompress(self, data, original_length):
         """
@@ -621,21 +740,12 @@ class DeltaCompression(CompressionMethod):
         if not data:
             return b''
         
-        decompressed = bytearray()
-        
-        # First byte is stored as-is
-        if data:
-            decompressed.append(data[0])
-        
-        # Reconstruct from deltas
-        prev = data[0] if data else 0
-        for i in range(1, len(data)):
-            value = (prev + data[i]) & 0xFF  # Wrap around for byte arithmetic
-            decompressed.append(value)
-            prev = value
+        # The first byte is stored as-is, so a running sum of all bytes
+        # (wrapping in uint8) reconstructs the data
+        decompressed = np.cumsum(np.frombuffer(data, dtype=np.uint8), dtype=np.uint8)
         
         # Ensure we don't exceed the original length
-        return bytes(decompressed[:original_length])
+        return decompressed[:original_length].tobytes()
     
     def should_use(self, data, threshold=0.9):
         """
@@ -651,17 +761,8 @@ class DeltaCompression(CompressionMethod):
         if len(data) < 4:  # Too small for effective delta encoding
             return False
         
-        # Quick sampling to estimate if data has small variations
-        sample_size = min(1000, len(data))
-        sample_step = max(1, len(data) // sample_size)
-        
-        small_deltas = 0
-        for i in range(0, len(data) - 1, sample_step):
-            delta = abs(data[i] - data[i + 1])
-            if delta < 32:  # Small delta
-                small_deltas += 1
-        
-        small_delta_ratio = small_deltas / (sample_size - 1)
+        # Sampled fraction of adjacent bytes differing by less than 32
+        small_delta_ratio = chunk_stats(data).variation
         
         # If more than 50% of deltas are small, delta encoding might be effective
         return small_delta_ratio > 0.5
@@ -671,6 +772,8 @@ class NoCompression(CompressionMethod):
     """
     No compression - used when other methods would not be effective
     """
+    releases_gil = True
+
     @property
     def type_id(self):
         return 255
@@ -703,11 +806,11 @@ class NoCompression(CompressionMethod):
         if len(data) != original_length:
             if len(data) < original_length:
                 # Pad with zeros if needed
-                print(f"Warning: NoCompression data is short ({len(data)} vs {original_length}), padding with zeros")
+                logger.warning("NoCompression data is short (%s vs %s), padding with zeros", len(data), original_length)
                 return bytes(data) + b'\x00' * (original_length - len(data))
             else:
                 # Truncate if needed
-                print(f"Warning: NoCompression data is long ({len(data)} vs {original_length}), truncating")
+                logger.warning("NoCompression data is long (%s vs %s), truncating", len(data), original_length)
                 return bytes(data[:original_length])
         
         return bytes(data)
@@ -0,0 +1,110 @@
+import logging
+import numpy as np
+
+# Try to import numba for the JIT-compiled boundary scan
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    logging.getLogger(__name__).info("numba library not available. Content-defined chunking will use NumPy.")
+
+
+# Gear hash table: one fixed pseudo-random 64-bit value per byte value.
+# Seeded so the same content is always cut at the same positions.
+GEAR = np.random.default_rng(0x47454152).integers(0, 2**64, size=256, dtype=np.uint64)
+
+# The Gear hash at a position covers the last 64 bytes
+GEAR_WINDOW = 64
+
+# Bytes hashed per block by the NumPy implementation
+NUMPY_BLOCK_SIZE = 1 << 20
+
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _gear_cuts(data, gear, min_size, max_size, mask):
+        """
+        Chunk end offsets for data (uint8 array). The rolling hash is
+        updated for every byte, so it only depends on the last 64 bytes.
+        """
+        n = len(data)
+        cuts = np.empty(n // min_size + 2, dtype=np.int64)
+        count = 0
+        start = 0
+        h = np.uint64(0)
+        for i in range(n):
+            h = (h << np.uint64(1)) + gear[data[i]]
+            size = i + 1 - start
+            if (size >= min_size and (h & mask) == 0) or size >= max_size:
+                cuts[count] = i + 1
+                count += 1
+                start = i + 1
+        if start < n:
+            cuts[count] = n
+            count += 1
+        return cuts[:count]
+
+
+def _gear_candidates(data, mask):
+    """
+    All offsets just after a byte whose 64-byte Gear hash matches the
+    mask, computed block by block with NumPy (uint64 arithmetic wraps).
+    Gear values are looked up per block, so memory use is proportional
+    to NUMPY_BLOCK_SIZE rather than to the input.
+    """
+    candidates = []
+    for block_start in range(0, len(data), NUMPY_BLOCK_SIZE):
+        block_end = min(block_start + NUMPY_BLOCK_SIZE, len(data))
+        # Include the preceding window so hashes at the block start are complete
+        lo = max(0, block_start - GEAR_WINDOW + 1)
+        g = GEAR[data[lo:block_end]]
+        h = g.copy()
+        for shift in range(1, GEAR_WINDOW):
+            h[shift:] += g[:-shift] << np.uint64(shift)
+        hits = np.flatnonzero((h[block_start - lo:] & mask) == 0)
+        candidates.append(hits + block_start + 1)
+    return np.concatenate(candidates) if candidates else np.empty(0, dtype=np.int64)
+
+
+def cdc_boundaries(data, min_size=2048, avg_size=8192, max_size=65536):
+    """
+    Find content-defined chunk boundaries with a Gear rolling hash.
+
+    A chunk is cut after a byte whose hash has all mask bits clear, which
+    happens with probability 1/avg_size, as long as the chunk is at least
+    min_size bytes; chunks are always cut at max_size. Because cuts depend
+    only on nearby content, an insertion shifts just the boundaries around it.
+
+    Args:
+        data (bytes): The data to split
+        min_size (int): Minimum chunk size in bytes
+        avg_size (int): Target average spacing of hash cut points
+        max_size (int): Maximum chunk size in bytes
+
+    Returns:
+        list: Chunk end offsets, in increasing order, ending with len(data)
+    """
+    byte_values = np.frombuffer(data, dtype=np.uint8)
+    if len(byte_values) == 0:
+        return []
+
+    # Test the high bits, which depend on the whole 64-byte window
+    bits = max(1, int(avg_size).bit_length() - 1)
+    mask = np.uint64(((1 << bits) - 1) << (64 - bits))
+
+    if HAS_NUMBA:
+        return _gear_cuts(byte_values, GEAR, min_size, max_size, mask).tolist()
+
+    candidates = _gear_candidates(byte_values, mask)
+    n = len(byte_values)
+    cuts = []
+    start = 0
+    while start < n:
+        end = min(start + max_size, n)
+        k = np.searchsorted(candidates, start + min_size)
+        if k < len(candidates) and candidates[k] <= end:
+            end = int(candidates[k])
+        cuts.append(end)
+        start = end
+    return cuts
@@ -143,11 +143,13 @@ def compress_file_enhanced(interface, file, chunk_size_label, use_mt):
         sys.stdout = log_capture
         
         try:
-            # Create AdaptiveCompressor instance without passing any chunk-size overrides;
-            # it will choose dynamically.
-            compressor = interface.compressor.__class__()
-            if use_mt:
+            # Reuse the interface's compressor, so its worker pool persists
+            # across clicks; it chooses chunk sizes dynamically.
+            compressor = interface.compressor
+            if use_mt and not compressor.use_multithreading:
                 compressor.enable_multithreading()
+            elif not use_mt and compressor.use_multithreading:
+                compressor.disable_multithreading()
             stats = compressor.compress(file_path, output_path)
         finally:
             sys.stdout = original_stdout
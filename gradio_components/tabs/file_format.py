@@ -19,14 +19,14 @@ def create_file_format_tab():
         ```
         ┌────────────┬────────────┬────────────┬────────────┬────────────┬────────────┐
         │   MAGIC    │   SIZE     │  MARKER    │ CHECKSUM   │  ORIG      │   COMP     │
-        │  (4 bytes) │  (4 bytes) │  INFO      │  (17 bytes)│  SIZE      │   SIZE     │
+        │  (4 bytes) │  (4 bytes) │  INFO      │  (33 bytes)│  SIZE      │   SIZE     │
         └────────────┴────────────┴────────────┴────────────┴────────────┴────────────┘
         ```
         
         - **MAGIC**: 4-byte signature "AMBC"
         - **SIZE**: Header size (4 bytes)
-        - **MARKER INFO**: Marker length and bytes
-        - **CHECKSUM**: MD5 hash of original data
+        - **MARKER INFO**: Marker length and bytes (length 0 in version 4 files, unless chunk markers are enabled)
+        - **CHECKSUM**: Checksum type (1 byte) and SHA-256 hash of original data (MD5 in version 2 files)
         - **ORIG SIZE**: Original file size (8 bytes)
         - **COMP SIZE**: Compressed file size (8 bytes)
         
@@ -38,7 +38,7 @@ def create_file_format_tab():
         └────────────┴────────────┴────────────┴────────────┴────────────┘
         ```
         
-        - **MARKER**: Unique binary pattern
+        - **MARKER**: Unique binary pattern (absent in version 4 files, where packages are framed by their sizes alone)
         - **METHOD ID**: Compression method identifier (1 byte)
         - **COMP SIZE**: Compressed data size (variable length)
         - **ORIG SIZE**: Original data size (variable length)
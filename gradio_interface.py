@@ -14,7 +14,7 @@ import numpy as np
 # Import the newly updated, dynamic chunk-based AdaptiveCompressor
 # This is the version that tries multiple chunk sizes and picks
 # whichever method+size yields the best ratio for that segment.
-from adaptive_compressor import AdaptiveCompressor
+from adaptive_compressor import AdaptiveCompressor, configure_logging
 from compression_analyzer import CompressionAnalyzer
 
 # Check if gradio is available
@@ -122,7 +122,7 @@ class EnhancedGradioInterface:
             
             ### How It Works
             - The file is divided at runtime: for each potential segment, 
-              the algorithm tests various chunk sizes (e.g., 1 KB, 2 KB, … up to 128 KB) 
+              the algorithm tests various chunk sizes (e.g., 4 KB, 8 KB, … up to 64 KB) 
               and tries multiple compression methods on each chunk. 
             - Whichever combination yields the best compression ratio for that chunk 
               is chosen, then the chunk is finalized and appended to the compressed output. 
@@ -276,5 +276,6 @@ class GradioInterface(EnhancedGradioInterface):
 
 
 if __name__=="__main__":
+    configure_logging()
     interface = EnhancedGradioInterface()
     interface.run()
@@ -16,7 +16,7 @@ from compression_methods import (
     DeltaCompression,
     NoCompression
 )
-from adaptive_compressor import AdaptiveCompressor
+from adaptive_compressor import AdaptiveCompressor, configure_logging
 from compression_analyzer import CompressionAnalyzer
 
 # Try to import the compatibility layer if available
@@ -93,6 +93,8 @@ def main():
     Main entry point for the Adaptive Marker-Based Compression program.
     If no subcommand is provided, the enhanced GUI will be launched by default.
     """
+    configure_logging()
+
     parser = argparse.ArgumentParser(
         description="Adaptive Marker-Based Compression Algorithm"
     )
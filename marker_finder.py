@@ -1,14 +1,81 @@
 import os
 import time
+import logging
 from bitarray import bitarray
 import numpy as np
 
+# Try to import numba for the JIT-compiled pattern scan
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    logging.getLogger(__name__).info("numba library not available. Marker search will use NumPy.")
+
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _mark_patterns(data, marker_length):
+        """
+        Mark every marker_length-bit pattern present in data (uint8 array).
+        Bits are shifted one at a time into a rolling register, so no
+        temporary window arrays are needed.
+        """
+        found = np.zeros(1 << marker_length, dtype=np.bool_)
+        mask = (1 << marker_length) - 1
+        acc = 0
+        bits_seen = 0
+        for byte in data:
+            for k in range(7, -1, -1):
+                acc = ((acc << 1) | ((byte >> k) & 1)) & mask
+                bits_seen += 1
+                if bits_seen >= marker_length:
+                    found[acc] = True
+        return found
+
+    # Compile (or load from cache) up front for read-only input, the type
+    # file mappings have, so no compilation ever holds on to a mapping
+    _mark_patterns(np.frombuffer(bytes(1), dtype=np.uint8), 1)
+
+
+def _mark_patterns_numpy(data, marker_length):
+    """
+    NumPy version of _mark_patterns. Each byte offset gets a big-endian
+    64-bit register of the 8 bytes starting there; the windows starting
+    0-7 bits into that byte are then one shift and mask each, so all bit
+    offsets take 8 vectorized steps. Needs marker_length <= 57.
+    """
+    found = np.zeros(1 << marker_length, dtype=np.bool_)
+    n = len(data)
+    padded = np.concatenate((data, np.zeros(7, dtype=np.uint8))).astype(np.uint64)
+    reg = np.zeros(n, dtype=np.uint64)
+    for j in range(8):
+        reg = (reg << np.uint64(8)) | padded[j:j + n]
+    
+    mask = np.uint64((1 << marker_length) - 1)
+    for k in range(8):
+        # Windows starting at bit 8*i + k that end within the data
+        count = (8 * n - marker_length - k) // 8 + 1
+        if count <= 0:
+            break
+        found[(reg[:count] >> np.uint64(64 - marker_length - k)) & mask] = True
+    return found
+
+
+logger = logging.getLogger(__name__)
+
+
 class MarkerFinder:
     """
     Class for finding the shortest binary string that does not appear in the file.
     This is used as a marker for the compression algorithm.
     """
     
+    # From this length on, byte-multiple marker lengths are searched by
+    # testing candidates instead of building the full pattern table
+    CANDIDATE_SEARCH_MIN_LENGTH = 24
+    CANDIDATE_SEARCH_LIMIT = 4096
+    
     def __init__(self, max_marker_length=32):
         """
         Initialize the MarkerFinder.
@@ -38,89 +105,151 @@ class MarkerFinder:
         if sample_size and len(file_data) > sample_size:
             # Sample evenly throughout the file
             step = len(file_data) // sample_size
-            sampled_data = bytearray()
-            sample_points = []
-            
-            for i in range(0, len(file_data), step):
-                sampled_data.extend(file_data[i:i+1])
-                sample_points.append(i)
-            
-            file_data = bytes(sampled_data[:sample_size])
-            
-            print(f"Finding marker using {len(file_data)} bytes sampled from a {len(file_data)} byte file")
-            print(f"Sampling every {step} bytes at {len(sample_points)} points")
+            original_size = len(file_data)
+
+            # A strided view over the (possibly mapped) data, copied out once
+            file_data = np.frombuffer(file_data, dtype=np.uint8)[::step][:sample_size].tobytes()
+
+            logger.info("Finding marker using %d bytes sampled from a %d byte file", len(file_data), original_size)
+            logger.debug("Sampling every %d bytes", step)
         else:
-            print(f"Finding marker in entire file ({len(file_data)} bytes)")
-        
-        # Convert to bitarray for bit-level operations
-        bits = bitarray()
-        bits.frombytes(file_data)
+            logger.info("Finding marker in entire file (%d bytes)", len(file_data))
         
+        byte_values = np.frombuffer(file_data, dtype=np.uint8)
+
         # Start with the smallest possible length
-        marker_length = 1
+        marker_length = self._min_marker_length(byte_values)
+        if marker_length > 1:
+            logger.debug("All %d-bit patterns occur byte-aligned, starting at %d bits", marker_length - 1, marker_length)
+
         while marker_length <= self.max_marker_length:
-            print(f"Checking markers of length {marker_length} bits ({2**marker_length} possibilities)")
+            logger.debug("Checking markers of length %d bits (%d possibilities)", marker_length, 2**marker_length)
             
             check_start_time = time.time()
             
-            # For optimization, we'll use a sliding window approach
-            # This is much faster than generating all possible markers
-            possible_markers = 2**marker_length
-            found = np.zeros(possible_markers, dtype=bool)
+            # Large byte-multiple lengths: test candidates directly before
+            # building a (16 MB+) pattern table
+            i = None
+            if marker_length % 8 == 0 and marker_length >= self.CANDIDATE_SEARCH_MIN_LENGTH:
+                i = self._find_absent_candidate(file_data, marker_length)
+                if i is not None:
+                    logger.debug("  Found absent candidate in %.4f seconds", time.time() - check_start_time)
             
-            # Check all bit windows of marker_length in the file
-            for i in range(len(bits) - marker_length + 1):
-                # Extract the window and convert to an integer
-                window = bits[i:i+marker_length]
-                # Important: convert the bit pattern to integer correctly
-                window_str = window.to01()
-                value = int(window_str, 2)
+            if i is None:
+                possible_markers = 2**marker_length
+                if HAS_NUMBA:
+                    found = _mark_patterns(byte_values, marker_length)
+                else:
+                    found = _mark_patterns_numpy(byte_values, marker_length)
                 
-                # Mark this pattern as found
-                if value < possible_markers:
-                    found[value] = True
-            
-            # Calculate what percentage of possible patterns were found
-            patterns_found = np.sum(found)
-            coverage_percent = (patterns_found / possible_markers) * 100
-            
-            check_time = time.time() - check_start_time
-            print(f"  Found {patterns_found} of {possible_markers} patterns ({coverage_percent:.2f}%) in {check_time:.4f} seconds")
+                # Every absent pattern, in increasing order, from one C-level pass
+                missing = np.flatnonzero(~found)
+                
+                # Calculate what percentage of possible patterns were found
+                patterns_found = possible_markers - missing.size
+                coverage_percent = (patterns_found / possible_markers) * 100
+                
+                check_time = time.time() - check_start_time
+                logger.debug("  Found %d of %d patterns (%.2f%%) in %.4f seconds",
+                             patterns_found, possible_markers, coverage_percent, check_time)
+                
+                if missing.size:
+                    i = int(missing[0])
             
             # Check if any markers weren't found
-            for i in range(possible_markers):
-                if not found[i]:
-                    # Convert the integer to a bit string
-                    marker_str = bin(i)[2:].zfill(marker_length)
-                    
-                    # Create marker bits
-                    marker_bits = bitarray(marker_str)
-                    
-                    # For small markers, ensure they're in the most significant bits
-                    if marker_length <= 8:
-                        # Put the marker bits at the start of the first byte
-                        # First pad to 8 bits to ensure alignment
-                        while len(marker_bits) < 8:
-                            marker_bits.append(0)
-                        marker_bytes = marker_bits.tobytes()
-                    else:
-                        # For longer markers, pad to byte boundary
-                        padding = 8 - (marker_length % 8) if marker_length % 8 else 0
-                        padded_bits = marker_bits + bitarray('0' * padding)
-                        marker_bytes = padded_bits.tobytes()
-                    
-                    elapsed_time = time.time() - start_time
-                    print(f"Found marker of length {marker_length} bits in {elapsed_time:.4f} seconds")
-                    print(f"Marker binary: {marker_str}")
-                    print(f"Marker hex: {marker_bytes.hex()}")
-                    
-                    return marker_bytes, marker_length
+            if i is not None:
+                # Convert the integer to a bit string
+                marker_str = bin(i)[2:].zfill(marker_length)
+                
+                # Create marker bits
+                marker_bits = bitarray(marker_str)
+                
+                # For small markers, ensure they're in the most significant bits
+                if marker_length <= 8:
+                    # Put the marker bits at the start of the first byte
+                    # First pad to 8 bits to ensure alignment
+                    while len(marker_bits) < 8:
+                        marker_bits.append(0)
+                    marker_bytes = marker_bits.tobytes()
+                else:
+                    # For longer markers, pad to byte boundary
+                    padding = 8 - (marker_length % 8) if marker_length % 8 else 0
+                    padded_bits = marker_bits + bitarray('0' * padding)
+                    marker_bytes = padded_bits.tobytes()
+                
+                elapsed_time = time.time() - start_time
+                logger.info("Found marker of length %d bits in %.4f seconds", marker_length, elapsed_time)
+                logger.info("Marker binary: %s", marker_str)
+                logger.info("Marker hex: %s", marker_bytes.hex())
+                
+                return marker_bytes, marker_length
             
             # If all patterns of current length are found, try longer patterns
             marker_length += 1
         
         # If we reach here, we couldn't find a marker
         raise ValueError(f"Could not find a marker of length <= {self.max_marker_length} bits")
+
+    def _find_absent_candidate(self, file_data, marker_length):
+        """
+        Find the smallest byte-aligned pattern of marker_length bits (a
+        multiple of 8) that does not occur anywhere in the data, testing at
+        most CANDIDATE_SEARCH_LIMIT candidates in increasing order.
+
+        bytes.find rejects candidates occurring at a byte offset in C; the
+        survivors are confirmed at every bit offset with bitarray's search.
+
+        Args:
+            file_data (bytes): The (possibly sampled) file data
+            marker_length (int): Marker length in bits, a multiple of 8
+
+        Returns:
+            int: The absent pattern, or None if no tested candidate is absent
+        """
+        data_bits = None
+        for value in range(min(2**marker_length, self.CANDIDATE_SEARCH_LIMIT)):
+            pattern = value.to_bytes(marker_length // 8, 'big')
+            if file_data.find(pattern) != -1:
+                continue
+            
+            if data_bits is None:
+                data_bits = bitarray()
+                data_bits.frombytes(file_data)
+            candidate = bitarray()
+            candidate.frombytes(pattern)
+            if data_bits.find(candidate) == -1:
+                return value
+        
+        return None
+
+    def _min_marker_length(self, byte_values):
+        """
+        Get a lower bound on the marker length from byte-aligned windows.
+
+        Byte-aligned windows are a subset of all bit windows, so if every
+        byte value (or every byte pair) occurs in the data, no marker of
+        8 (or 16) bits or shorter can exist.
+
+        Args:
+            byte_values (np.ndarray): The data as a uint8 array
+
+        Returns:
+            int: Marker length (in bits) to start the search at
+        """
+        present = np.zeros(256, dtype=bool)
+        present[byte_values] = True
+        if not present.all():
+            return 1
+
+        # Every adjacent byte pair, i.e. both phases of a 2-byte view
+        pairs = (byte_values[:-1].astype(np.uint16) << 8) | byte_values[1:]
+        present = np.zeros(65536, dtype=bool)
+        present[pairs] = True
+        if not present.all():
+            return 9
+
+        return 17
+
     def find_marker_naive(self, file_data):
         """
         A simpler but less efficient implementation of find_marker.
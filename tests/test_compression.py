@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
 
+import io
 import os
 import sys
 import tempfile
+import math
 import unittest
 import random
+from collections import Counter
+from unittest import mock
+
+import numpy as np
 
 # Add parent directory to path to enable imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from adaptive_compressor import AdaptiveCompressor
+import adaptive_compressor
+import compression_methods
+import content_chunking
+from adaptive_compressor import AdaptiveCompressor, HAS_BLAKE3
 
 
 class TestCompression(unittest.TestCase):
@@ -101,6 +110,138 @@ class TestCompression(unittest.TestCase):
             self.assertIn('ratio', stats, f"Missing ratio for chunk size {chunk_size}")
             print(f"✓ Chunk size {chunk_size}: ratio {stats['ratio']:.3f}, {stats['percent_reduction']:.1f}% reduction")
     
+    def test_checksum_types(self):
+        """Test SHA-256 headers and that legacy (version 3 markers, version 2 MD5) files still decompress"""
+        input_path = self.files["text"]
+        with open(input_path, "rb") as f:
+            original_data = f.read()
+
+        for checksum_type, version in [(2, 4), (2, 3), (1, 2)]:
+            compressed_path = os.path.join(self.test_dir, f"text_checksum_{checksum_type}.ambc")
+            decompressed_path = os.path.join(self.test_dir, f"text_checksum_{checksum_type}")
+
+            compressor = AdaptiveCompressor()
+            compressor.CHECKSUM_TYPE = checksum_type
+            compressor.FORMAT_VERSION = version
+            compressor.compress(input_path, compressed_path)
+
+            with open(compressed_path, "rb") as f:
+                header = AdaptiveCompressor()._parse_header(f.read())
+            self.assertEqual(header['format_version'], version)
+            self.assertEqual(header['checksum_type'], checksum_type)
+            self.assertEqual(len(header['checksum']), AdaptiveCompressor.CHECKSUM_TYPES[checksum_type][1])
+            # only version 4 chunks are framed without a marker
+            self.assertEqual(header['marker_length'] == 0, version >= 4)
+
+            AdaptiveCompressor().decompress(compressed_path, decompressed_path)
+            with open(decompressed_path, "rb") as f:
+                self.assertEqual(f.read(), original_data)
+
+            os.unlink(compressed_path)
+            os.unlink(decompressed_path)
+
+    @unittest.skipIf(not HAS_BLAKE3, "blake3 not available")
+    def test_blake3_checksum(self):
+        """Test that files with BLAKE3 checksums round-trip"""
+        input_path = self.files["text"]
+        compressed_path = os.path.join(self.test_dir, "text_blake3.ambc")
+        with open(input_path, "rb") as f:
+            original_data = f.read()
+
+        compressor = AdaptiveCompressor()
+        compressor.CHECKSUM_TYPE = 3
+        compressor.compress(input_path, compressed_path)
+
+        out = io.BytesIO()
+        AdaptiveCompressor().decompress_to_stream(compressed_path, out)
+        self.assertEqual(out.getvalue(), original_data)
+
+        os.unlink(compressed_path)
+
+    def test_parallel_compression(self):
+        """Test that compressing and decompressing with worker processes round-trips"""
+        input_path = os.path.join(self.test_dir, "parallel.dat")
+        compressed_path = os.path.join(self.test_dir, "parallel.ambc")
+        decompressed_path = os.path.join(self.test_dir, "parallel_decompressed")
+        original_data = bytes(i % 251 for i in range(200000)) + b"parallel chunk test " * 10000
+        with open(input_path, "wb") as f:
+            f.write(original_data)
+
+        with AdaptiveCompressor() as compressor:
+            compressor.enable_multithreading(max_workers=2)
+            # Compress twice to reuse the same worker pool
+            for _ in range(2):
+                stats = compressor.compress(input_path, compressed_path)
+                self.assertLess(stats['compressed_size'], len(original_data))
+
+                compressor.decompress(compressed_path, decompressed_path)
+                with open(decompressed_path, "rb") as f:
+                    self.assertEqual(f.read(), original_data)
+        # leaving the block shuts the worker pool down
+        self.assertIsNone(compressor._pool)
+
+        for path in [input_path, compressed_path, decompressed_path]:
+            os.unlink(path)
+
+    def test_content_defined_chunking(self):
+        """Test that content-defined chunking round-trips"""
+        input_path = self.files["text"]
+        compressed_path = os.path.join(self.test_dir, "text_cdc.ambc")
+        decompressed_path = os.path.join(self.test_dir, "text_cdc")
+        with open(input_path, "rb") as f:
+            original_data = f.read()
+
+        compressor = AdaptiveCompressor()
+        compressor.enable_content_defined_chunking(min_size=256, avg_size=512, max_size=1024)
+        stats = compressor.compress(input_path, compressed_path)
+        self.assertLess(stats['compressed_size'], len(original_data))
+
+        compressor.decompress(compressed_path, decompressed_path)
+        with open(decompressed_path, "rb") as f:
+            self.assertEqual(f.read(), original_data)
+
+        for path in [compressed_path, decompressed_path]:
+            os.unlink(path)
+
+    def test_repeated_random_block(self):
+        """Test that high-entropy data repeating over long ranges is compressed"""
+        input_path = os.path.join(self.test_dir, "repeated_random.dat")
+        compressed_path = os.path.join(self.test_dir, "repeated_random.ambc")
+        decompressed_path = os.path.join(self.test_dir, "repeated_random_decompressed")
+        rng = random.Random(42)
+        original_data = bytes(rng.getrandbits(8) for _ in range(8192)) * 32
+        with open(input_path, "wb") as f:
+            f.write(original_data)
+
+        # Each byte histogram looks random; only the repeats compress
+        compressor = AdaptiveCompressor()
+        stats = compressor.compress(input_path, compressed_path)
+        self.assertLess(stats['compressed_size'], len(original_data) // 2)
+
+        compressor.decompress(compressed_path, decompressed_path)
+        with open(decompressed_path, "rb") as f:
+            self.assertEqual(f.read(), original_data)
+
+        for path in [input_path, compressed_path, decompressed_path]:
+            os.unlink(path)
+
+    def test_decompress_to_stream(self):
+        """Test decompressing into a binary stream"""
+        input_path = self.files["text"]
+        compressed_path = os.path.join(self.test_dir, "text_stream.ambc")
+        with open(input_path, "rb") as f:
+            original_data = f.read()
+
+        compressor = AdaptiveCompressor()
+        compressor.compress(input_path, compressed_path)
+
+        out = io.BytesIO()
+        stats = compressor.decompress_to_stream(compressed_path, out)
+        self.assertEqual(out.getvalue(), original_data)
+        self.assertEqual(stats['decompressed_size'], len(original_data))
+
+        os.unlink(compressed_path)
+
     @classmethod
     def tearDownClass(cls):
         """Clean up test files"""
@@ -133,5 +274,103 @@ class TestCompression(unittest.TestCase):
             pass  # Directory might not be empty
 
 
+class TestFallbackPaths(unittest.TestCase):
+    """Test the NumPy/Python paths used when numba is not available"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(1234)
+        cls.datasets = [
+            bytes(rng.randint(0, 255) for _ in range(20000)),
+            bytes(i % 251 for i in range(20000)) + b"structured text " * 1000 + b"\x00" * 3000,
+        ]
+
+    def test_chunk_stats_fallback(self):
+        """Test that the NumPy chunk statistics match brute force and numba"""
+        for data in self.datasets:
+            a = np.frombuffer(data, dtype=np.uint8)
+            for step in (1, 3, 20):
+                n = len(data)
+                entropy = -sum(c / n * math.log2(c / n) for c in Counter(data).values())
+                pairs = [(data[i], data[i + 1]) for i in range(0, n - 1, step)]
+                repeats = sum(x == y for x, y in pairs)
+                small_deltas = sum(abs(x - y) < 32 for x, y in pairs)
+                text = sum(32 <= b <= 127 or b in (9, 10, 13) for b in data)
+                
+                results = [compression_methods._chunk_stats_numpy(a, step)]
+                if compression_methods.HAS_NUMBA:
+                    results.append(compression_methods._chunk_stats_nb(a, step))
+                for result in results:
+                    self.assertAlmostEqual(result[0], entropy, places=9)
+                    self.assertEqual(tuple(int(v) for v in result[1:]), (repeats, small_deltas, text))
+
+    def test_gear_candidates_fallback(self):
+        """Test that the NumPy Gear hash and boundaries match brute force and numba"""
+        min_size, avg_size, max_size = 256, 1024, 4096
+        bits = avg_size.bit_length() - 1
+        mask = ((1 << bits) - 1) << (64 - bits)
+        gear = [int(g) for g in content_chunking.GEAR]
+        for data in self.datasets:
+            # Rolling hash over every byte; only the last 64 bytes affect it
+            candidates = []
+            cuts = []
+            h = 0
+            start = 0
+            for i, b in enumerate(data):
+                h = ((h << 1) + gear[b]) & (2**64 - 1)
+                if h & mask == 0:
+                    candidates.append(i + 1)
+                size = i + 1 - start
+                if (size >= min_size and h & mask == 0) or size >= max_size:
+                    cuts.append(i + 1)
+                    start = i + 1
+            if start < len(data):
+                cuts.append(len(data))
+            
+            # Small blocks, so hashes spanning block boundaries are checked
+            with mock.patch.object(content_chunking, "HAS_NUMBA", False), \
+                    mock.patch.object(content_chunking, "NUMPY_BLOCK_SIZE", 4096):
+                found = content_chunking._gear_candidates(np.frombuffer(data, dtype=np.uint8), np.uint64(mask))
+                self.assertEqual(found.tolist(), candidates)
+                self.assertEqual(content_chunking.cdc_boundaries(data, min_size, avg_size, max_size), cuts)
+            if content_chunking.HAS_NUMBA:
+                self.assertEqual(content_chunking.cdc_boundaries(data, min_size, avg_size, max_size), cuts)
+
+    def test_scan_chunks_fallback(self):
+        """Test that the Python chunk header scan matches numba and round-trips"""
+        test_dir = tempfile.mkdtemp()
+        input_path = os.path.join(test_dir, "scan.dat")
+        compressed_path = os.path.join(test_dir, "scan.ambc")
+        decompressed_path = os.path.join(test_dir, "scan_decompressed")
+        original_data = self.datasets[1] * 4
+        with open(input_path, "wb") as f:
+            f.write(original_data)
+        
+        # Length-framed chunks, and chunks that each start with a marker
+        for use_markers in (False, True):
+            compressor = AdaptiveCompressor()
+            if use_markers:
+                compressor.enable_chunk_markers()
+            compressor.compress(input_path, compressed_path)
+            with open(compressed_path, "rb") as f:
+                compressed = f.read()
+            header = compressor._parse_header(compressed)
+            compressor._init_marker(header['marker_bytes'], header['marker_length'])
+            
+            with mock.patch.object(adaptive_compressor, "HAS_NUMBA", False):
+                chunks = compressor._scan_chunks(compressed, header['header_size'])
+                compressor.decompress(compressed_path, decompressed_path)
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual(sum(orig_len for _, orig_len, _, _ in chunks), len(original_data))
+            with open(decompressed_path, "rb") as f:
+                self.assertEqual(f.read(), original_data)
+            if adaptive_compressor.HAS_NUMBA:
+                self.assertEqual(compressor._scan_chunks(compressed, header['header_size']), chunks)
+        
+        for path in [input_path, compressed_path, decompressed_path]:
+            os.unlink(path)
+        os.rmdir(test_dir)
+
+
 if __name__ == "__main__":
     unittest.main()
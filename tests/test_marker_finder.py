@@ -4,12 +4,14 @@ import os
 import sys
 import unittest
 import random
+import numpy as np
 from bitarray import bitarray
 
 # Add parent directory to path to enable imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from marker_finder import MarkerFinder
+import marker_finder
+from marker_finder import MarkerFinder, _mark_patterns_numpy
 
 
 class TestMarkerFinder(unittest.TestCase):
@@ -79,6 +81,29 @@ class TestMarkerFinder(unittest.TestCase):
             
             print(f"✓ Dataset {i}: Found marker of length {marker_length} bits within limit")
     
+    def test_mark_patterns_fallback(self):
+        """Test that the NumPy pattern scan matches brute force and numba"""
+        test_datasets = [
+            bytes(random.randint(0, 255) for _ in range(300)),
+            b'\x00' * 50 + bytes(range(0, 256, 3)) + b'AB' * 20,
+            b'\xa5',
+        ]
+        for data in test_datasets:
+            bits = bitarray()
+            bits.frombytes(data)
+            bits = bits.to01()
+            byte_values = np.frombuffer(data, dtype=np.uint8)
+            for marker_length in range(1, 13):
+                expected = np.zeros(1 << marker_length, dtype=bool)
+                for i in range(len(bits) - marker_length + 1):
+                    expected[int(bits[i:i + marker_length], 2)] = True
+                
+                found = _mark_patterns_numpy(byte_values, marker_length)
+                np.testing.assert_array_equal(found, expected)
+                if marker_finder.HAS_NUMBA:
+                    np.testing.assert_array_equal(
+                        marker_finder._mark_patterns(byte_values, marker_length), expected)
+
     def _verify_marker_not_present(self, data, marker_bytes, marker_length):
         """Verify that the marker is not present in the data"""
         # Convert marker to bitarray